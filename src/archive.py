@@ -0,0 +1,299 @@
+"""
+Compressed, indexed chat log archives
+An archive (<channel>_<Month>_<day>_<year>.arc) is a sequence of independently zlib-compressed blocks of log
+lines. Its sidecar index (.arc.idx) holds one JSON line per block with the block's offset, size, first and last
+timestamps and the users who chatted in it, so a query reads and decompresses only the blocks it needs.
+Lines that are not yet part of a block are kept uncompressed in a .arc.tail file, which queries also read.
+
+usage:
+    python archive.py convert local_logs/somechannel              # convert .txt logs to archives
+    python archive.py convert --force local_logs/somechannel      # replace archives that already exist
+    python archive.py query local_logs --user someone --text kappa --start 2026-10-01 --end 2026-10-18T12:00
+"""
+import argparse
+import datetime
+import glob
+import json
+import multiprocessing
+import os
+import re
+import time
+import zlib
+
+TIMESTAMP = re.compile(r'\[([0-9]+):([0-9]{2}):([0-9]{2})\] ([^:]*):')
+FILE_DATE = re.compile(r'_([A-Za-z]+)_([0-9]+)_([0-9]+)\.(txt|arc)$')
+
+
+def file_date(file_name):
+    """the date in a log or archive file name (ex: channel_October_18_2026.txt)"""
+    match = FILE_DATE.search(file_name)
+    return datetime.datetime.strptime(' '.join(match.groups()[:3]), '%B %d %Y').date()
+
+
+def line_time(date, line):
+    """returns (ISO timestamp, username) for a log line, or (None, None) if it has no timestamp"""
+    match = TIMESTAMP.match(line)
+    if not match:
+        return None, None
+    hour, minute, second, username = match.groups()
+    return '%sT%02d:%s:%s' % (date.isoformat(), int(hour), minute, second), username
+
+
+class ArchiveWriter:
+    def __init__(self, file_name, channel, date, block_lines=2000, seal_interval=600):
+        """Appends log lines to an archive, compressing them a block at a time.
+        Used like a text file by LogWriter: write() takes newline-separated lines, flush() puts the buffered lines
+        on disk and close() writes them out as a block. Blocks are only written when they are full, when the
+        oldest buffered line is seal_interval seconds old, or on close; in between, flush() rewrites the
+        buffered lines to the uncompressed .tail file, so that short flushes don't make short blocks.
+        :param file_name: the archive's path (the index and tail are written next to it, with .idx and .tail
+            appended)
+        :param channel: the channel the log belongs to
+        :param date: the datetime.date of the log's lines
+        :param block_lines: the number of lines per compressed block
+        :param seal_interval: the maximum number of seconds a line waits in the tail before it is compressed
+        """
+        self.file_name = file_name
+        self.channel = channel
+        self.date = date
+        self.block_lines = block_lines
+        self.seal_interval = seal_interval
+        self.lines = []
+        self.start = None
+        self.end = None
+        self.users = set()
+        self.opened = None  # time.monotonic() when the oldest buffered line was added
+        if not os.path.exists(file_name + '.idx'):
+            with open(file_name + '.idx', 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'channel': channel, 'date': date.isoformat(), 'codec': 'zlib'}) + '\n')
+        if os.path.exists(file_name + '.tail'):  # left by a bot that stopped without closing the archive
+            with open(file_name + '.tail', encoding='utf-8') as f:
+                self.write(f.read())
+
+    def write(self, text):
+        for line in text.split('\n'):
+            if line:
+                self.add(line)
+
+    def add(self, line):
+        timestamp, username = line_time(self.date, line)
+        if timestamp:
+            if self.start is None:
+                self.start = timestamp
+            self.end = timestamp
+            self.users.add(username)
+        if not self.lines:
+            self.opened = time.monotonic()
+        self.lines.append(line)
+        if len(self.lines) >= self.block_lines:
+            self.write_block()
+
+    def write_block(self):
+        if not self.lines:
+            return
+        block = zlib.compress(('\n'.join(self.lines) + '\n').encode('utf-8'), 6)
+        with open(self.file_name, 'ab') as f:
+            offset = f.tell()
+            f.write(block)
+        entry = {'offset': offset, 'size': len(block), 'lines': len(self.lines), 'start': self.start,
+                 'end': self.end, 'users': sorted(self.users)}
+        with open(self.file_name + '.idx', 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        if os.path.exists(self.file_name + '.tail'):
+            os.remove(self.file_name + '.tail')
+        self.lines = []
+        self.start = self.end = None
+        self.users = set()
+        self.opened = None
+
+    def write_tail(self):
+        """replaces the tail file with the buffered lines"""
+        temp_name = self.file_name + '.tail.tmp'
+        with open(temp_name, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.lines) + '\n')
+        os.replace(temp_name, self.file_name + '.tail')
+
+    def flush(self):
+        """puts the buffered lines on disk where queries can read them: in a block if they have waited
+        seal_interval seconds, otherwise in the tail file"""
+        if not self.lines:
+            return
+        if time.monotonic() - self.opened >= self.seal_interval:
+            self.write_block()
+        else:
+            self.write_tail()
+
+    def close(self):
+        self.write_block()
+
+
+def read_index(file_name):
+    """returns (header, blocks) from an archive's index"""
+    with open(file_name + '.idx', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        return header, [json.loads(line) for line in f if line.strip()]
+
+
+def read_tail(file_name):
+    """returns the lines of an archive that are not yet in a block, as one string"""
+    try:
+        with open(file_name + '.tail', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:  # there is no tail, or it was just written out as a block
+        return ''
+
+
+def read_text(file_name):
+    """returns every line of an archive, decompressed, as one string"""
+    header, blocks = read_index(file_name)
+    text = []
+    if blocks:
+        with open(file_name, 'rb') as f:
+            for block in blocks:
+                f.seek(block['offset'])
+                text.append(zlib.decompress(f.read(block['size'])).decode('utf-8'))
+    text.append(read_tail(file_name))
+    return ''.join(text)
+
+
+def convert(txt_name, block_lines=2000, remove=False, force=False):
+    """converts a .txt log to an archive in the same folder, streaming it a block at a time.
+    Raises FileExistsError if the archive already exists, unless force is True, in which case it is replaced."""
+    channel = os.path.basename(txt_name).rsplit('_', 3)[0]
+    arc_name = txt_name[:-len('.txt')] + '.arc'
+    existing = [name for name in (arc_name, arc_name + '.idx', arc_name + '.tail') if os.path.exists(name)]
+    if existing and not force:
+        raise FileExistsError(arc_name + ' already exists (use --force to replace it)')
+    for name in existing:
+        os.remove(name)
+    writer = ArchiveWriter(arc_name, channel, file_date(txt_name), block_lines)
+    with open(txt_name, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if line:
+                writer.add(line)
+    writer.close()
+    if remove:
+        os.remove(txt_name)
+    return arc_name
+
+
+def find_files(paths, extension):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, '**', '*' + extension), recursive=True))
+        elif path.endswith(extension):
+            files.append(path)
+    return sorted(files)
+
+
+def find_archives(paths):
+    """the archives under the paths, found by their indexes, since an archive with only a tail has no .arc yet"""
+    names = [name[:-len('.idx')] for name in find_files(paths, '.arc.idx')]
+    return sorted(set(names + [path for path in paths if path.endswith('.arc')]))
+
+
+def plan(file_name, start=None, end=None, user=None):
+    """returns the (file name, header, block) tasks for the blocks of an archive that might match the query"""
+    header, blocks = read_index(file_name)
+    tasks = []
+    for block in blocks:
+        if start and block['end'] and block['end'] < start:
+            continue
+        if end and block['start'] and block['start'] > end:
+            continue
+        if user and user not in block['users']:
+            continue
+        tasks.append((file_name, header, block))
+    if os.path.exists(file_name + '.tail'):
+        tasks.append((file_name, header, {'tail': True}))  # unindexed, so filtered line by line
+    return tasks
+
+
+def search_block(task, start=None, end=None, user=None, text=None):
+    """decompresses one block and returns its matching lines, prefixed with the channel and date"""
+    file_name, header, block = task
+    if block.get('tail'):
+        data = read_tail(file_name)
+    else:
+        with open(file_name, 'rb') as f:
+            f.seek(block['offset'])
+            data = zlib.decompress(f.read(block['size'])).decode('utf-8')
+    date = datetime.date.fromisoformat(header['date'])
+    prefix = '#' + header['channel'] + ' ' + header['date'] + ' '
+    text = text.lower() if text else None
+    matches = []
+    for line in data.splitlines():
+        if text and text not in line.lower():
+            continue
+        if start or end or user:
+            timestamp, username = line_time(date, line)
+            if user and username != user:
+                continue
+            if timestamp and ((start and timestamp < start) or (end and timestamp > end)):
+                continue
+        matches.append(prefix + line)
+    return matches
+
+
+def search_task(arguments):
+    return search_block(*arguments)
+
+
+def query(paths, start=None, end=None, user=None, text=None, workers=None):
+    """yields the matching lines of every archive under the paths, in file and block order.
+    Blocks are searched by a pool of worker processes when there is more than one archive."""
+    if user:
+        user = user.lower()
+    tasks = []
+    for file_name in find_archives(paths):
+        tasks.extend((task, start, end, user, text) for task in plan(file_name, start, end, user))
+    if len(tasks) < 2 or workers == 1:
+        for task in tasks:
+            for line in search_task(task):
+                yield line
+        return
+    with multiprocessing.Pool(workers) as pool:
+        for lines in pool.imap(search_task, tasks):
+            for line in lines:
+                yield line
+
+
+def iso_time(value, end=False):
+    """parses a date (the whole day) or a date and time for --start/--end"""
+    if 'T' not in value:
+        value += 'T23:59:59' if end else 'T00:00:00'
+    return datetime.datetime.fromisoformat(value).isoformat()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='compressed, indexed chat log archives')
+    subparsers = parser.add_subparsers(dest='action', required=True)
+    convert_parser = subparsers.add_parser('convert', help='convert .txt logs to archives')
+    convert_parser.add_argument('paths', nargs='+', help='.txt files or folders containing them')
+    convert_parser.add_argument('--remove', action='store_true', help='delete each .txt log once converted')
+    convert_parser.add_argument('--force', action='store_true', help='replace archives that already exist')
+    query_parser = subparsers.add_parser('query', help='search archives')
+    query_parser.add_argument('paths', nargs='+', help='.arc files or folders containing them')
+    query_parser.add_argument('--start', help='earliest date or time (ex: 2026-10-01 or 2026-10-01T18:30:00)')
+    query_parser.add_argument('--end', help='latest date or time')
+    query_parser.add_argument('--user', help='only messages from this user')
+    query_parser.add_argument('--text', help='only messages containing this text (case-insensitive)')
+    query_parser.add_argument('--workers', type=int, help='number of worker processes (default: one per CPU)')
+    args = parser.parse_args()
+    if args.action == 'convert':
+        for txt_name in find_files(args.paths, '.txt'):
+            try:
+                print(convert(txt_name, remove=args.remove, force=args.force))
+            except FileExistsError as e:
+                print("skipped " + txt_name + ": " + str(e))
+    else:
+        start = iso_time(args.start) if args.start else None
+        end = iso_time(args.end, end=True) if args.end else None
+        for line in query(args.paths, start, end, args.user, args.text, args.workers):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,24 @@
-import os
+import asyncio
 import re
-import select
-import socket
-import json
 import time
 import commands
-from utilities import LogDate
-from utilities import PhiQueue
+from clock import clock
+from clock import Cooldowns
+from configstore import JSONStore
+from connection import Connection
+from connection import JoinLimiter
+from dispatch import CommandIndex
+from executor import CommandExecutor
+from flood import FloodDetector
+from irc import parse_message
+from logwriter import LogWriter
+from matcher import PhraseMatcher
+from metrics import Metrics
+from responsecache import ResponseCache
+from scheduler import CHAT, CONTROL, MODERATION
+from stats import chat_stats
+from utilities import ChatHistory
+from utilities import ChatRecord
 
 
 class Bot:
@@ -24,93 +36,249 @@ class Bot:
         self.name = bot_info[0]
         self.oauth = bot_info[1]
         self.channels = in_channels
-        self.s = socket.socket()             # the connection socket object
+        self.server = ('irc.chat.twitch.tv', 6667)  # the IRC server's address
+        self.channels_per_connection = 50   # channels are sharded across as many connections as this requires
+        self.connections = []                # the bot's connections (see shard_channels)
+        self.channel_connections = {}        # channel -> the connection that joined it
+        self.join_limiter = JoinLimiter()    # paces JOINs across all of the bot's connections
+        self.message_buckets = {}            # the message rate limits, shared by all of the bot's connections
+        self.worker_processes = 0            # if set, chat messages are handled by this many worker processes
+        self.worker_pool = None
         self.is_moderator = False            # set to True if bot has administrative privileges in the channel
-        self.commands = self.get_commands()  # list of bot-familiar commands from bot_files/command_list.txt
-        self.prohibited = self.get_prohibited()  # list of prohibited phrases and their associated timeout times
-        self.time_restrict = 0    # number of seconds before another bot message can be sent (doesn't apply to admins)
-        self.local_commands = ['!delcommand', '!add', '!del']
-        self.last = 0             # the last time a message was sent (used for time-restricting commands)
-        self.history = PhiQueue(maxsize=300000)  # a list of the last 300,000 messages
-
-    def establish_connection(self):
-        """establish the connection to Twitch chat channels"""
-        self.s.connect(('irc.chat.twitch.tv', 6667))
-        self.s.send(('PASS ' + self.oauth + '\n').encode('utf-8'))
-        self.s.send(('NICK '+self.name+'\n').encode('utf-8'))
-        for channel in self.channels:
-            self.s.send(('JOIN #'+channel+'\n').encode('utf-8'))
-        self.s.send('CAP REQ :twitch.tv/commands\n'.encode())
+        # commands.json and prohibited.json, kept in memory and written behind (see sync_config)
+        self.command_store = JSONStore('bot_files/commands.json')
+        self.prohibited_store = JSONStore('bot_files/prohibited.json')
+        self.config_interval = 1  # seconds between checks for changes to save, or made to the files elsewhere
+        self.commands = self.command_store.data  # list of bot-familiar commands from bot_files/commands.json
+        self.prohibited = self.prohibited_store.data  # prohibited phrases and their associated timeout times
+        # compiled from self.prohibited; case-insensitive and NFKC-normalized so look-alike characters still match
+        self.prohibited_matcher = PhraseMatcher(self.prohibited, casefold=True, normalize='NFKC')
+        # cooldowns, in seconds (admins are exempt): between two commands from the same user, and between two uses
+        # of the same command in a channel (command_cooldowns overrides command_cooldown for individual commands)
+        self.user_cooldown = 0
+        self.command_cooldown = 0
+        self.command_cooldowns = {}
+        self.cooldowns = Cooldowns()
+        self.local_commands = ['!delcommand', '!add', '!del', '!seen', '!lastmsg']
+        # server messages excluded from terminal output
+        self.server_messages = {'USERSTATE', 'NOTICE', 'CLEARCHAT', 'CLEARMSG', 'USERNOTICE', 'ROOMSTATE',
+                                'GLOBALUSERSTATE'}
+        self.command_index = CommandIndex(self.commands)  # first-word lookup tables for command dispatch
+        self.local_command_index = CommandIndex(self.local_commands)
+        self.executor = CommandExecutor()  # runs FUNC commands on worker threads, with timeouts
+        self.executor.inline.update(['timeout_user', 'untimeout', 'new_command', 'google', 'stats'])  # fast built-ins
+        self.response_cache = ResponseCache()  # recent results of @cacheable command functions
+        # an identical command reply isn't sent again to a channel within this many seconds (reply_windows overrides
+        # reply_window for individual channels); admin confirmations, timeouts and other chat commands always are
+        self.reply_window = 5
+        self.reply_windows = {}
+        self.recent_replies = Cooldowns()
+        self.history = ChatHistory(maxsize=300000)  # the last 300,000 messages, as ChatRecords
+        self.flood = FloodDetector()  # times out users who flood, repeat themselves or spam copypasta (moderators only)
+        self.retro_window = 200   # when a phrase is prohibited, each channel's last 200 messages are checked for it
+        self.log_writer = LogWriter()  # buffers chat logs and writes them to local_logs in batches
+        self.verbose = True       # print every chat message and whisper to the terminal
+        self.chat_stats = chat_stats  # message rates, top chatters and top emotes per channel (read with !stats)
+        self.metrics = Metrics()  # per-stage message counts and latencies (whisper !metrics to read them)
+        self.metrics_file = 'local_logs/' + self.name + '_metrics.json'  # set to None to stop writing metrics
+        self.metrics_interval = 60  # seconds between writes of the metrics file
+
+    def shard_channels(self):
+        """spreads the bot's channels across as many connections as channels_per_connection requires"""
+        count = max(1, -(-len(self.channels) // self.channels_per_connection))
+        self.connections = [Connection(self, self.channels[i::count], i) for i in range(count)]
+        self.channel_connections = {}
+        for connection in self.connections:
+            for channel in connection.channels:
+                self.channel_connections[channel] = connection
 
     def run(self):
         """Establishes a connection and constantly reads incoming data from the server"""
+        asyncio.run(self.run_async())
+
+    async def run_async(self):
+        """Connects every connection in the pool and handles their messages until terminated"""
         print('establishing connection...')
-        self.establish_connection()
-        time.clock()
-        server_messages = ['USERSTATE', 'NOTICE', 'CLEARCHAT', 'USERNOTICE']
-        while not self.terminate:
-            readable, writable, exceptional = select.select([self.s], [self.s], [], 120)
-            for read in readable:
-                raw_recv = read.recv(2048).decode().strip("\r\n")
-                if re.findall('@(.*).tmi.twitch.tv PRIVMSG (.*) :(.*)', raw_recv):
-                    message = self.format_message(raw_recv)
-                    print('#' + message)
-                    self.handle_message(message)
-                elif re.findall('@(.*).tmi.twitch.tv WHISPER (.*) :(.*)', raw_recv):
-                    whisper = self.format_whisper(raw_recv)
-                    print('(whisper to ' + self.name + "): " + ' '.join(whisper.split(' ')[1:]))
-                    self.handle_whisper(whisper)
-                elif raw_recv.find('PING :') != -1:
-                    print(raw_recv)
-                    self.ping()
-                elif raw_recv.find(':tmi.twitch.tv NOTICE * :Login authentication failed') != -1:
-                    print(raw_recv)
-                    exit()
-                elif len(raw_recv.split(' ')) > 1 and raw_recv.split(' ')[1] in server_messages:
-                    pass  # Exclude from terminal output
-                else:
-                    # print all else
-                    print(raw_recv)
+        if not self.connections:
+            self.shard_channels()
+        if self.worker_processes:
+            from workers import WorkerPool  # imported here, since workers imports this module
+            self.worker_pool = WorkerPool(self, self.worker_processes)
+            self.worker_pool.start(asyncio.get_running_loop())
+        self.backfill_stats()
+        self.log_writer.start()
+        tasks = [asyncio.create_task(connection.run()) for connection in self.connections]
+        metrics_task = asyncio.create_task(self.write_metrics())
+        config_task = asyncio.create_task(self.watch_config())
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            self.terminate = True
+            if self.worker_pool is not None:
+                self.worker_pool.stop()
+                await asyncio.get_running_loop().run_in_executor(None, self.worker_pool.join)
+                self.metrics = self.combined_metrics()  # keep the workers' final counts
+                self.worker_pool = None
+                await asyncio.sleep(0.1)  # let the workers' last lines reach the connections
+            for connection in self.connections:
+                connection.close()
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            metrics_task.cancel()
+            config_task.cancel()
+            self.executor.shutdown()
+            self.command_store.flush()
+            self.prohibited_store.flush()
+            self.log_writer.close()
+            if self.metrics_file:
+                self.metrics.write(self.metrics_file)
         print("bot terminated")
 
-    def ping(self):
+    async def watch_config(self):
+        """periodically saves command and prohibited phrase changes, and reloads edits made elsewhere"""
+        while True:
+            await asyncio.sleep(self.config_interval)
+            self.sync_config()
+
+    def sync_config(self):
+        """writes pending changes to commands.json and prohibited.json, and applies changes made to the files
+        by hand or by other bots, updating only the affected commands and phrases"""
+        changed, removed = self.command_store.sync()
+        for command in changed:
+            self.command_index.add(command)
+        for command in removed:
+            self.command_index.remove(command)
+        if changed or removed:
+            print('commands reloaded: ' + str(len(changed)) + ' changed, ' + str(len(removed)) + ' removed')
+        changed, removed = self.prohibited_store.sync()
+        for phrase in changed:
+            added = phrase not in self.prohibited_matcher
+            self.prohibited_matcher.add(phrase)
+            if added:  # a new phrase from another bot or worker process, or added by hand
+                self.moderate_history(phrase)
+        for phrase in removed:
+            self.prohibited_matcher.remove(phrase)
+        if changed or removed:
+            print('prohibited phrases reloaded: ' + str(len(changed)) + ' changed, ' + str(len(removed)) + ' removed')
+
+    async def write_metrics(self):
+        """periodically writes the metrics report to metrics_file"""
+        while self.metrics_file:
+            await asyncio.sleep(self.metrics_interval)
+            self.combined_metrics().write(self.metrics_file)
+
+    def combined_metrics(self):
+        """the bot's metrics, plus the latest metrics reported by its worker processes"""
+        if self.worker_pool is None:
+            return self.metrics
+        metrics = Metrics()
+        metrics.started = self.metrics.started
+        metrics.merge(self.metrics)
+        for worker_metrics in list(self.worker_pool.metrics.values()):
+            metrics.merge(worker_metrics)
+        return metrics
+
+    def send_raw(self, line, channel=None, priority=CONTROL):
+        """queues a raw IRC line on the connection that owns the channel (whispers use the first connection)
+        Returns False if the line duplicates a chat line that is already waiting to be sent."""
+        if not self.connections:
+            self.shard_channels()
+        connection = self.channel_connections.get(channel) or self.connections[0]
+        return connection.send_raw(line, channel, priority)
+
+    def backfill_stats(self, channels=None):
+        """counts the logged messages from today and yesterday into the chat stats
+        :param channels: the channels to read logs for (default: every recorded channel)"""
+        if self.chat_stats is not None and self.worker_pool is None:
+            channels = self.record if channels is None else channels
+            self.chat_stats.backfill(self.log_writer.directory, channels or [], exclude=(self.name,))
+
+    def handle_line(self, line, connection=None):
+        """Parses a single line received from the server and passes it to the appropriate handler
+        :param connection: the Connection the line arrived on (server pings are answered on it)"""
+        start = time.perf_counter_ns()
+        irc_message = parse_message(line)
+        if self.worker_pool is not None and self.worker_pool.route(line, irc_message):
+            return
+        if irc_message.command == 'PRIVMSG':
+            message = self.format_message(irc_message)
+            self.metrics.record('parse', time.perf_counter_ns() - start, irc_message.channel)
+            if self.verbose:
+                print('#' + message)
+            self.handle_message(message, irc_message.tags)
+        elif irc_message.command == 'WHISPER':
+            whisper = self.format_whisper(irc_message)
+            if self.verbose:
+                print('(whisper to ' + self.name + "): " + ' '.join(whisper.split(' ')[1:]))
+            self.handle_whisper(whisper)
+        elif irc_message.command == 'PING':
+            if self.verbose:
+                print(line)
+            self.ping(irc_message.trailing, connection)
+        elif irc_message.command == 'NOTICE' and irc_message.trailing == 'Login authentication failed':
+            print(line)
+            exit()
+        elif irc_message.command in self.server_messages:
+            pass  # Exclude from terminal output
+        else:
+            # print all else
+            print(line)
+
+    def ping(self, payload='tmi.twitch.tv', connection=None):
         """Respond to the server ping and stay connected"""
-        self.s.send('PONG :pingis\n'.encode())
-        print("PONG :client")
+        (connection or self).send_raw('PONG :' + payload)
+        if self.verbose:
+            print("PONG :client")
 
-    def handle_message(self, fmessage):
-        """Handles various operations based on the latest received chat message (logging, commands, etc)"""
+    def handle_message(self, fmessage, tags=None):
+        """Handles various operations based on the latest received chat message (logging, commands, etc)
+        :param fmessage: the formatted message (see format_message)
+        :param tags: the message's optional IRCv3 tags (user-id, badges, etc)
+        """
         channel, timestamp, username, message = fmessage.split(' ', 3)
-        self.history.put((channel, timestamp, username, message))
         username = username[:-1]
+        badges = tags.get('badges', '') if tags else ''
+        is_mod = 'broadcaster/' in badges or 'moderator/' in badges  # Twitch won't time these users out
+        self.history.put(ChatRecord(channel, timestamp, username, message, is_mod))
         if not self.admins:  # testing should always be done be approved users
             self.admins = []
 
+        self.metrics.count('messages')
+        if self.chat_stats is not None:
+            self.chat_stats.add(channel, username, message, emotes_tag=tags.get('emotes') if tags else None)
+
         # check if we should log the message(s):
         if self.record and channel in self.record:
                 self.log_message(fmessage)
 
         # check if the message is a bot-familiar command:
-        in_list = False
-        if self.time_restricted(username) or username in self.admins:
-            for command in self.commands:
-                if message.lower().startswith(command):
-                    self.handle_command(channel, command, message, username)
-                    in_list = True
-                    break
-            if not in_list:
-                for command in self.local_commands:
-                    if message.lower().startswith(command):
-                        self.handle_local_commands(channel, command, message, username)
-                        break
+        start = time.perf_counter_ns()
+        match = self.command_index.match(message)
+        handler = self.handle_command
+        if not match:
+            match = self.local_command_index.match(message)
+            handler = self.handle_local_commands
+        if match and (username in self.admins or self.off_cooldown(channel, match[0], username)):
+            handler(channel, match[0], match[1], username)
+        self.metrics.record('dispatch', time.perf_counter_ns() - start, channel)
 
         # check if a non-mod user has typed a prohibited phrase. timeout accordingly (if bot is an admin)
         if self.is_moderator:
-            for phrase in self.prohibited:
-                if phrase in message and (username not in self.admins or username != channel):
+            start = time.perf_counter_ns()
+            for phrase in self.prohibited_matcher.find_all(message):
+                if (username not in self.admins or username != channel) and not is_mod:
+                    self.metrics.count('timeouts')
                     timeout_messages = commands.timeout(username, self.prohibited[phrase])
                     for message in timeout_messages:
                         self.send_message(channel, message)
+            if self.flood and username not in self.admins and username != channel and not is_mod:
+                reason = self.flood.check(channel, username, message, time.monotonic())
+                if reason:
+                    self.metrics.count('flood_timeouts')
+                    for timeout_message in commands.timeout(username, self.flood.timeout, reason):
+                        self.send_message(channel, timeout_message)
+            self.metrics.record('moderation', time.perf_counter_ns() - start, channel)
 
     def handle_whisper(self, fwhisper):
         """Handles various operations based on the latest received whisper"""
@@ -123,71 +291,80 @@ class Bot:
                 self.send_whisper(sender, "Hey! I'm whispering!")
             elif message == "!terminate" and sender in self.admins:  # terminate the bot!
                 self.terminate = True
+            elif message == "!metrics" and sender in self.admins:
+                self.send_whisper(sender, self.combined_metrics().summary())
 
-    def time_restricted(self, username):
-        """Checks if enough time has passed since the last bot message to satisfy the set time restriction"""
-        if self.time_restrict > 0 and username not in self.admins:
-            timeout = int(time.clock()) - self.time_restrict < self.last
-            return not timeout or self.last == 0
-        else:
-            return True
+    def off_cooldown(self, channel, command, username):
+        """Checks that neither the user nor the command (in this channel) is on cooldown, and if so starts both
+        cooldowns"""
+        now = clock.monotonic()
+        command_key = (channel, command)
+        if not (self.cooldowns.ready(username, now) and self.cooldowns.ready(command_key, now)):
+            return False
+        self.cooldowns.start(username, self.user_cooldown, now)
+        self.cooldowns.start(command_key, self.command_cooldowns.get(command, self.command_cooldown), now)
+        return True
 
-    def handle_command(self, channel, command, message, username):
-        """parses the command"""
+    def handle_command(self, channel, command, arguments, username):
+        """parses the command (arguments is the message minus the command)"""
         permission = True
-        arguments = re.sub("^" + command, "", message).lstrip()  # the message minus the command
         if command in self.local_commands:
             self.handle_local_commands(channel, command, arguments, username)
-        event = self.commands[command.lower()]
+        event = self.commands[command]
         if self.commands[command][2] == "ADMIN":
             permission = False
         if permission or username in self.admins:
             if self.commands[command][1] == "FUNC":
                 func_name = self.commands[command][0]
-                event = getattr(commands, func_name)(arguments)
-                if type(event) == list and func_name == "timeout_user":
-                    event = str(event[0])
-                if func_name == "new_command" and len(event) == 4:
-                    chat_message = "command already exists; command updated"
-                    if event[0] not in self.commands:
-                        chat_message = "command added"
-                    self.add_command(event)
-                    self.send_message(channel, chat_message)
-                else:
-                    if type(event) == list:
-                        for e in event:
-                            self.send_message(channel, e)
-                    else:
-                        self.send_message(channel, event)
+                func = getattr(commands, func_name)
+                if func_name == "stats" and not arguments.strip():
+                    arguments = channel  # !stats on its own reports on the channel it was typed in
+                self.call_function(channel, func_name, func, arguments)
             elif event != "":
-                self.send_message(channel, event[0])
-
-    def handle_local_commands(self, channel, command, message, username):
-        arguments = re.sub("^" + command, "", message).lstrip()
-        if username in self.admins:
-            if command == "!delcommand":
-                # delete a command
-                delete = arguments.split(" ")[0].lower()
-                if delete != "!addcommand" and delete != "!delcommand":
-                    delete_message = "command not found"
-                    if delete in self.commands:
-                        self.del_command(delete)
-                        delete_message = "command deleted"
-                    self.send_message(channel, delete_message)
-            elif command == "!add":
-                if len(arguments.split(" ")) > 1:
-                    timeout_length = arguments.split(" ")[0]
-                    phrase = arguments.split(" ")[1]
-                    self.add_prohib(timeout_length, phrase)
-                    self.send_message(channel, "phrase added")
-            elif command == "!del":
-                phrase = arguments.split(" ")[0]
-                self.del_prohib(phrase)
-                self.send_message(channel, "phrase deleted")
+                self.send_reply(channel, event[0])
+
+    def call_function(self, channel, func_name, func, arguments):
+        """calls a FUNC command's function on the executor (or reuses a cached result) and sends the result"""
+        callback = lambda result: self.handle_result(channel, func_name, result)
+        if getattr(func, 'cacheable', False):
+            key = self.response_cache.key(channel, func_name, arguments)
+            hit, result = self.response_cache.get(key, clock.monotonic())
+            if hit:
+                self.metrics.count('cache_hits')
+                self.handle_result(channel, func_name, result)
+                return
+            callback = lambda result: self.cache_result(key, func, channel, func_name, result)
+        if not self.executor.submit(func_name, func, arguments, callback):
+            self.metrics.count('commands_dropped')
+
+    def cache_result(self, key, func, channel, func_name, event):
+        """stores the result of a cacheable FUNC command, then sends it"""
+        self.response_cache.put(key, event, clock.monotonic(), func.cache_ttl)
+        self.handle_result(channel, func_name, event)
 
+    def handle_result(self, channel, func_name, event):
+        """sends the result of a FUNC command (called once the command function has returned)"""
+        if type(event) == list and func_name == "timeout_user":
+            event = str(event[0])
+        if func_name == "new_command" and len(event) == 4:
+            chat_message = "command already exists; command updated"
+            if event[0] not in self.commands:
+                chat_message = "command added"
+            self.add_command(event)
+            self.send_message(channel, chat_message)
+        else:
+            if type(event) == list:
+                for e in event:
+                    self.send_reply(channel, e)
+            else:
+                self.send_reply(channel, event)
+
+    def handle_local_commands(self, channel, command, arguments, username):
+        """handles the commands that need the bot's own state (command lists, prohibited phrases, history)"""
         if command == "!delcommand" and username in self.admins:
             # delete a command
             delete = arguments.split(" ")[0].lower()
+            delete = self.command_index.keys.get(delete, delete)  # the command's key, whatever its case
             if delete != "!addcommand" and delete != "!delcommand":
                 delete_message = "command not found"
                 if delete in self.commands:
@@ -204,106 +381,129 @@ class Bot:
             phrase = arguments.split(" ")[0].lower()
             self.del_prohib(phrase)
             self.send_message(channel, "phrase deleted")
+        elif command == "!seen" and arguments:
+            seen = arguments.split(" ")[0].lower().lstrip("@")
+            record = self.history.last_message(seen)
+            if record:
+                self.send_reply(channel, seen + " was last seen in #" + record.channel + " at " + record.timestamp)
+            else:
+                self.send_reply(channel, seen + " hasn't been seen recently")
+        elif command == "!lastmsg":
+            user = arguments.split(" ")[0].lower().lstrip("@") or username
+            records = self.history.user_messages(user, channel)
+            record = next(records, None)
+            if user == username:
+                record = next(records, None)  # skip the !lastmsg message itself
+            if record:
+                self.send_reply(channel, user + " " + record.timestamp + ": " + record.message)
+            else:
+                self.send_reply(channel, "no recent messages from " + user)
+
+    def send_reply(self, channel, message):
+        """sends a command's reply to the channel, unless the same reply was sent there within the reply window"""
+        message = str(message)
+        if not message.startswith("/") or message.startswith("/me"):
+            now = clock.monotonic()
+            if not self.recent_replies.ready((channel, message), now):
+                self.metrics.count('replies_suppressed')
+                return  # the same reply was just sent to this channel
+            self.recent_replies.start((channel, message), self.reply_windows.get(channel, self.reply_window), now)
+        self.send_message(channel, message)
 
     def send_message(self, channel, message):
         """sends a chat message to the target channel"""
-        self.s.send(('PRIVMSG ' + '#' + channel + ' :' + str(message) + '\r\n').encode("utf-8"))
-        self.last = int(time.clock())
-        timestamp = LogDate().timestamp
+        start = time.perf_counter_ns()
+        message = str(message)
+        # chat commands like /timeout skip ahead of ordinary replies
+        priority = MODERATION if message.startswith("/") and not message.startswith("/me") else CHAT
+        if not self.send_raw('PRIVMSG ' + '#' + channel + ' :' + message, channel, priority):
+            return  # an identical reply is already waiting to be sent
+        timestamp = clock.timestamp
         formatted_message = channel + ' ' + timestamp + ' ' + self.name + ': ' + message
         if not message.startswith("/") or message.startswith("/me"):
             # don't record commands like /timeout
-            print('#' + formatted_message)
+            if self.verbose:
+                print('#' + formatted_message)
             if channel in self.record:
                 self.log_message(formatted_message)
+        self.metrics.count('sent')
+        self.metrics.record('send', time.perf_counter_ns() - start, channel)
 
     def send_whisper(self, receiver, message):
         """sends a whisper to the target user"""
-        self.s.send(('PRIVMSG #jtv :/w ' + receiver + " " + message + '\r\n').encode("utf-8"))
-        timestamp = LogDate().timestamp
-        print("(whisper to " + receiver + ") " + timestamp + ' ' + self.name + ': ' + message)
-
-    def format_whisper(self, whisper_raw):
-        """Converts the incoming whisper to a readable format (receiver + timestamp + username + message)"""
-        timestamp = LogDate().timestamp
-        whisper = whisper_raw.split(':', 2)
-        sender = whisper_raw.split(':', 2)[1].split('!')[0]
-        message = whisper[2]
-        whisper = self.name + ' ' + timestamp + ' ' + sender + ": " + message
-        return whisper
+        if not self.send_raw('PRIVMSG #jtv :/w ' + receiver + " " + message, 'jtv', CHAT):
+            return
+        timestamp = clock.timestamp
+        if self.verbose:
+            print("(whisper to " + receiver + ") " + timestamp + ' ' + self.name + ': ' + message)
+
+    def format_whisper(self, whisper):
+        """Converts the incoming whisper (a raw line or a parsed IRCMessage) to a readable format
+        (receiver + timestamp + username + message)"""
+        if isinstance(whisper, str):
+            whisper = parse_message(whisper)
+        timestamp = clock.timestamp
+        return self.name + ' ' + timestamp + ' ' + whisper.nick + ": " + whisper.trailing
 
     @staticmethod
-    def format_message(message_raw):
-        """Converts the incoming chat messages to a readable format (channel + timestamp + username + message)"""
-        message_raw = message_raw.split(':', 2)
-        if len(message_raw) > 2:
-            try:
-                username = message_raw[1].split("!", 1)[0]  # the Twitch username of the person who sent this message
-                message = message_raw[2]  # the message that the user sent
-                channel = re.findall('PRIVMSG (.*)', message_raw[1])[0].strip()[1:]  # message source channel
-                timestamp = LogDate().timestamp
-                formatted_message = channel + ' ' + timestamp + ' ' + username + ': ' + message
-                return formatted_message
-            except IndexError:
-                print("INDEX ERROR ON : " + message_raw)
+    def format_message(message):
+        """Converts the incoming chat message (a raw line or a parsed IRCMessage) to a readable format
+        (channel + timestamp + username + message)"""
+        if isinstance(message, str):
+            message = parse_message(message)
+        timestamp = clock.timestamp
+        return message.channel + ' ' + timestamp + ' ' + message.nick + ': ' + message.trailing
 
     def add_command(self, command):
         """add a command to the commands list"""
-        self.commands[command[0]] = command[1:]
-        with open('bot_files/commands.json', 'w') as f:
-            json.dump(self.commands, f)
-        self.commands = self.get_commands()
+        self.command_store.set(command[0], command[1:])
+        self.command_index.add(command[0])
 
     def del_command(self, command):
         """delete a command"""
         if command in self.commands:
-            del self.commands[command]
-        with open('bot_files/commands.json', 'w') as f:
-            json.dump(self.commands, f)
-        self.commands = self.get_commands()
+            self.command_store.delete(command)
+            self.command_index.remove(command)
 
     def add_prohib(self, length, phrase):
         """adds a new prohibited phrase to prohibited.json"""
         if re.match('[0-9]+(d|s|m|h)', length):
-            self.prohibited[phrase] = length
-            with open('bot_files/prohibited.json', 'w') as f:
-                json.dump(self.prohibited, f)
-            self.prohibited = self.get_prohibited()
+            self.prohibited_store.set(phrase, length)
+            self.prohibited_matcher.add(phrase)
+            self.moderate_history(phrase)
+
+    def moderate_history(self, phrase):
+        """times out users who said a newly prohibited phrase in the last retro_window messages of a channel"""
+        if not self.is_moderator:
+            return
+        matcher = PhraseMatcher([phrase], casefold=True, normalize='NFKC')
+        for channel in list(self.history.by_channel):
+            timed_out = set()
+            for record in self.history.channel_messages(channel, self.retro_window):
+                username = record.username
+                if username in timed_out or username in self.admins or username == channel or record.is_mod:
+                    continue
+                if matcher.find_all(record.message):
+                    timed_out.add(username)
+                    for message in commands.timeout(username, self.prohibited[phrase]):
+                        self.send_message(channel, message)
 
     def del_prohib(self, phrase):
-        """adds a new prohibited phrase to prohibited.json"""
+        """deletes a prohibited phrase from prohibited.json"""
         if phrase in self.prohibited:
-            del self.prohibited[phrase]
-            with open('bot_files/prohibited.json', 'w') as f:
-                json.dump(self.prohibited, f)
-            self.prohibited = self.get_prohibited()
-
-    @staticmethod
-    def get_commands():
-        """Retrieve a dictionary of command names and functions from command_list.txt"""
-        with open('bot_files/commands.json') as f:
-            command_dict = json.load(f)
-        return command_dict
+            self.prohibited_store.delete(phrase)
+            self.prohibited_matcher.remove(phrase)
 
-    @staticmethod
-    def get_prohibited():
-        """Returns a list of prohibited phrases and their associated timeout times (in minutes)"""
-        with open('bot_files/prohibited.json') as f:
-            prohibited = json.load(f)
-        return prohibited
-
-    @staticmethod
-    def log_message(in_message):
+    def log_message(self, in_message):
         """records the chat message to the appropriate log file"""
-        channel = in_message.split(' ')[0]
-        message = ' '.join(in_message.split(' ')[1:])
-        date = LogDate()
-        if not os.path.exists('./local_logs/' + channel):
-            os.makedirs('./local_logs/' + channel)
-        base = "local_logs/" + channel + "/" + channel + "_"
-        file_name = base + date.month + "_" + date.day + "_" + date.year + ".txt"
-        with open(file_name, "a", encoding="utf-8") as current_file:
-            current_file.write(message + '\n')
-
+        start = time.perf_counter_ns()
+        channel, _, message = in_message.partition(' ')
+        self.log_writer.write(channel, message)
+        self.metrics.record('log', time.perf_counter_ns() - start, channel)
 
 
+def run_bots(bots):
+    """runs several bots in one process, sharing a single event loop"""
+    async def run_all():
+        await asyncio.gather(*(bot.run_async() for bot in bots))
+    asyncio.run(run_all())
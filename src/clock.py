@@ -0,0 +1,73 @@
+import datetime
+import time
+
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
+          'November', 'December']
+
+
+class Clock:
+    def __init__(self):
+        """A shared source of the time for the bot: the [H:MM:SS] timestamp used in chat output and logs, and
+        today's date in the form used by log file names (see LogDate), both recomputed only when the second or
+        the day changes. monotonic() is the clock for cooldowns and other intervals."""
+        self.second = None
+        self.cached_timestamp = ''
+        self.yday = None
+        self.today = None  # (month, day, year, datetime.date), replaced as a whole so threads never see a mix
+
+    monotonic = staticmethod(time.monotonic)
+
+    def refresh(self):
+        second = int(time.time())
+        if second != self.second:
+            local = time.localtime(second)
+            self.cached_timestamp = '[%d:%02d:%02d]' % (local.tm_hour, local.tm_min, local.tm_sec)
+            if local.tm_yday != self.yday:
+                date = datetime.date(local.tm_year, local.tm_mon, local.tm_mday)
+                self.today = (MONTHS[local.tm_mon - 1], '%02d' % local.tm_mday, str(local.tm_year), date)
+                self.yday = local.tm_yday
+            self.second = second
+
+    @property
+    def timestamp(self):
+        """the current time as [H:MM:SS]"""
+        self.refresh()
+        return self.cached_timestamp
+
+    @property
+    def date(self):
+        """today's (month name, zero-padded day, year, datetime.date)"""
+        self.refresh()
+        return self.today
+
+
+clock = Clock()  # shared by every bot in the process
+
+
+class Cooldowns:
+    def __init__(self, sweep_size=1024):
+        """A table of keys (users, commands, or anything hashable) that are on cooldown until a given time
+        on the monotonic clock. Checks and starts are O(1); expired entries are dropped whenever the table
+        doubles in size.
+        :param sweep_size: the table size that triggers the first sweep
+        """
+        self.sweep_size = sweep_size
+        self.expires = {}  # key -> monotonic time the cooldown ends
+        self.sweep_at = sweep_size
+
+    def ready(self, key, now):
+        """True if the key isn't on cooldown"""
+        return self.expires.get(key, 0) <= now
+
+    def start(self, key, seconds, now):
+        """puts the key on cooldown for the given number of seconds"""
+        if seconds <= 0:
+            return
+        self.expires[key] = now + seconds
+        if len(self.expires) >= self.sweep_at:
+            self.expires = {key: end for key, end in self.expires.items() if end > now}
+            self.sweep_at = max(self.sweep_size, len(self.expires) * 2)
+
+    def clear(self):
+        self.expires = {}
+        self.sweep_at = self.sweep_size
@@ -3,10 +3,13 @@ A collection of functions called by the bot
 These should be either in response to a !command from chat or for using /commands
 Includes a simple function for timing-out a user as an example.
 Other commands https://help.twitch.tv/customer/portal/articles/659095-chat-moderation-commands
+Functions whose result depends only on their arguments can be marked @cacheable, so repeated calls reuse it
 """
+from responsecache import cacheable
+from stats import chat_stats
 
 
-def timeout(username, time):
+def timeout(username, time, reason="prohibited phrase"):
     """
     Timeout a user for a given number of minutes
     Returns the timeout command and the chat message
@@ -20,7 +23,7 @@ def timeout(username, time):
     else:
         time_out = time[:-1]  # assumed to be seconds (ex: 4s)
     return [('/timeout ' + username + ' ' + time_out),
-            (str(time) + ' ' + str(username) + ' for prohibited phrase')]
+            (str(time) + ' ' + str(username) + ' for ' + reason)]
 
 
 def timeout_user(arguments):
@@ -44,27 +47,35 @@ def new_command(arguments):
             c_list[0] = command.lower()
             c_list[1] = event
             if command.startswith("!!"):
-                c_list[0] = command[1:]
+                c_list[0] = command[1:].lower()
                 c_list[3] = "ADMIN"
             print(c_list)
             return c_list
     return "!addcommand requires a command name and an argument"
 
 
+@cacheable(ttl=300)
 def google(arguments):
     """
     a sample function: creates a google link to google a list of search term arguments
     example !google neat thing
     bot: http://google.com/search?q=neat+thing
     """
-    arg_list = arguments.split(' ')
-    url_base = "http://google.com/search?q="
-    for token in arg_list:
-        if token != "":
-            url_base += token + "+"
-    if url_base.endswith("="):
+    terms = "+".join(arguments.split())
+    if not terms:
         return ""
-    return url_base[:-1]
+    return "http://google.com/search?q=" + terms
+
+
+def stats(arguments):
+    """
+    messages per minute, top chatters and top emotes for a channel
+    example !stats somechannel (the bot fills in the current channel when none is given)
+    """
+    channel = arguments.split(' ')[0].lower().lstrip("#")
+    if not channel:
+        return "!stats requires a channel"
+    return chat_stats.summary(channel)
 
 
 # add other functions here (and to command list)
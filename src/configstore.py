@@ -0,0 +1,107 @@
+import json
+import os
+import tempfile
+import time
+
+DELETED = object()  # marks a pending deletion
+
+
+class JSONStore:
+    def __init__(self, file_name, delay=2):
+        """A JSON dictionary file kept in memory. Changes are written behind, at most once every `delay` seconds,
+        and atomically (to a temporary file that replaces the original), while edits made to the file by hand
+        or by another bot are picked up by sync().
+        :param file_name: the path of the JSON file
+        :param delay: seconds to wait after a change before writing, so bulk edits are written once
+        """
+        self.file_name = file_name
+        self.delay = delay
+        self.data = {}
+        self.pending = {}     # key -> new value (or DELETED) not yet written to the file
+        self.changed_at = 0   # time.monotonic() of the first pending change
+        self.file_stat = None
+        self.data.update(self.load())
+        self.file_stat = self.stat()
+
+    def stat(self):
+        """the file's (modification time, size), used to notice when it has been changed elsewhere"""
+        try:
+            stat = os.stat(self.file_name)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def mode(self):
+        """the file's permissions, or the usual ones for a new file"""
+        try:
+            return os.stat(self.file_name).st_mode & 0o777
+        except FileNotFoundError:
+            return 0o644
+
+    def load(self):
+        with open(self.file_name, encoding='utf-8') as f:
+            return json.load(f)
+
+    def set(self, key, value):
+        if not self.pending:
+            self.changed_at = time.monotonic()
+        self.data[key] = value
+        self.pending[key] = value
+
+    def delete(self, key):
+        if key in self.data:
+            if not self.pending:
+                self.changed_at = time.monotonic()
+            del self.data[key]
+            self.pending[key] = DELETED
+
+    def save(self):
+        """writes the data to a temporary file, then replaces the original with it. Each save uses a temporary
+        file of its own, so bots (or worker processes) saving the same file at once can't mix their writes."""
+        fd, temp_name = tempfile.mkstemp(prefix=os.path.basename(self.file_name) + '.',
+                                         dir=os.path.dirname(self.file_name) or '.')
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                os.chmod(temp_name, self.mode())  # mkstemp creates files readable only by their owner
+                json.dump(self.data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_name, self.file_name)
+        except BaseException:
+            os.remove(temp_name)
+            raise
+        self.pending = {}
+        self.file_stat = self.stat()
+
+    def flush(self):
+        """writes any pending changes now"""
+        if self.pending:
+            self.save()
+
+    def sync(self):
+        """reloads the file if it was changed elsewhere (keeping pending changes made here), and writes pending
+        changes once the delay has passed. Returns the sets of keys that were (changed, removed) by the reload."""
+        changed, removed = set(), set()
+        stat = self.stat()
+        if stat is not None and stat != self.file_stat:
+            try:
+                disk = self.load()
+            except ValueError:
+                print('could not reload ' + self.file_name + ' (invalid JSON); keeping the current version')
+                disk = None
+            if disk is not None:
+                changed = {key for key, value in disk.items() if self.data.get(key) != value}
+                removed = set(self.data) - set(disk)
+                for key, value in self.pending.items():
+                    if value is DELETED:
+                        disk.pop(key, None)
+                    else:
+                        disk[key] = value
+                changed -= set(self.pending)
+                removed -= set(self.pending)
+                self.data.clear()
+                self.data.update(disk)
+                self.file_stat = stat
+        if self.pending and time.monotonic() - self.changed_at >= self.delay:
+            self.save()
+        return changed, removed
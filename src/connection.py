@@ -0,0 +1,230 @@
+import asyncio
+import time
+from irc import LineFramer
+from scheduler import OutboundScheduler
+from scheduler import CONTROL, TokenBucket
+
+
+class Connection:
+    def __init__(self, bot, channels, number=0):
+        """A single IRC connection owned by a bot, responsible for a shard of the bot's channels.
+        Lines received are passed to bot.handle_line; lines sent are rate limited per channel, and per account
+        (across all of the bot's connections).
+        :param bot: the Bot that handles this connection's messages
+        :param channels: the channels this connection joins (and re-joins after reconnecting)
+        :param number: the connection's position in the bot's pool (used in terminal output)
+        """
+        self.bot = bot
+        self.channels = channels
+        self.number = number
+        self.framer = LineFramer()            # splits the received byte stream into complete IRC lines
+        self.scheduler = OutboundScheduler()  # queues outbound lines and releases them within Twitch's rate limits
+        self.outbound_ready = None            # wakes the writer task when a line is queued (set while connected)
+        self.writer = None                    # the IRCProtocol of the current connection
+        self.keepalive = 240                  # seconds of silence before the bot pings the server
+        self.last_received = 0                # event loop time of the last data received from the server
+        self.backoff = (1, 300)               # initial and maximum seconds to wait before reconnecting
+
+    def __repr__(self):
+        return 'Connection(%d, %d channels)' % (self.number, len(self.channels))
+
+    def login(self):
+        """authenticate and request Twitch's IRC capabilities (channels are joined by join_channels)"""
+        self.send_raw('PASS ' + self.bot.oauth)
+        self.send_raw('NICK ' + self.bot.name)
+        self.send_raw('CAP REQ :twitch.tv/commands twitch.tv/tags')
+
+    async def join_channels(self):
+        """joins this connection's channels, no faster than the bot's JOIN rate limit allows"""
+        for channel in self.channels:
+            await self.bot.join_limiter.acquire()
+            self.send_raw('JOIN #' + channel)
+
+    async def run(self):
+        """stays connected until the bot is terminated, reconnecting with exponential backoff"""
+        delay = self.backoff[0]
+        while not self.bot.terminate:
+            try:
+                if await self.connect():
+                    delay = self.backoff[0]  # the connection was healthy; start the backoff over
+            except OSError as error:
+                print('connection ' + str(self.number) + ' failed: ' + str(error))
+            if self.bot.terminate:
+                break
+            print('connection ' + str(self.number) + ' reconnecting in ' + str(delay) + 's')
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.backoff[1])
+
+    async def connect(self):
+        """connects and reads until the connection drops; returns True if any data was received"""
+        loop = asyncio.get_running_loop()
+        _, self.writer = await loop.create_connection(lambda: IRCProtocol(self), *self.bot.server)
+        self.outbound_ready = asyncio.Event()
+        self.scheduler.configure(self.bot.is_moderator, self.bot.message_buckets)
+        self.last_received = asyncio.get_running_loop().time()
+        self.login()
+        tasks = [asyncio.create_task(self.write_outbound(self.writer)),
+                 asyncio.create_task(self.keep_alive(self.writer)),
+                 asyncio.create_task(self.join_channels())]
+        try:
+            return await self.writer.finished()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await self.close_connection(self.writer)
+
+    def read_incoming(self, size):
+        """passes each line completed by the `size` bytes just received into the framer's buffer to the bot"""
+        self.last_received = asyncio.get_running_loop().time()
+        start = time.perf_counter_ns()
+        lines = self.framer.feed(self.framer.view[:size])
+        self.bot.metrics.record('receive', time.perf_counter_ns() - start)
+        self.bot.metrics.count('bytes_received', size)
+        for line in lines:
+            try:
+                self.bot.handle_line(line, self)
+            except Exception as error:
+                # one bad line (or a bug in a command) mustn't take down the connection, or the bot
+                self.bot.metrics.count('errors')
+                print('connection ' + str(self.number) + ' failed to handle ' + repr(line) + ': ' + repr(error))
+
+    async def write_outbound(self, writer):
+        """writes queued lines as the rate limits allow, sending every line that is ready in one batch"""
+        while True:
+            lines = self.scheduler.pop_ready(time.monotonic())
+            if self.scheduler.dropped:
+                self.bot.metrics.count('chat_dropped', self.scheduler.dropped)
+                self.scheduler.dropped = 0
+            if lines:
+                writer.write(''.join(line + '\r\n' for line in lines).encode('utf-8'))
+                await writer.drain()
+                continue
+            self.outbound_ready.clear()
+            try:
+                await asyncio.wait_for(self.outbound_ready.wait(), self.scheduler.next_ready(time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+
+    async def keep_alive(self, writer):
+        """pings the server after a period of silence, and drops the connection if it stays silent"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.keepalive / 4)
+            silence = loop.time() - self.last_received
+            if silence > self.keepalive * 2:
+                print('connection ' + str(self.number) + ': no response from server')
+                writer.close()
+                return
+            if silence > self.keepalive:
+                self.send_raw('PING :tmi.twitch.tv')
+
+    async def close_connection(self, writer):
+        """writes any queued lines the rate limits allow, then closes the connection"""
+        lines = self.scheduler.pop_ready(time.monotonic())
+        self.outbound_ready = None
+        self.writer = None                    # the IRCProtocol of the current connection
+        try:
+            if lines:
+                writer.write(''.join(line + '\r\n' for line in lines).encode('utf-8'))
+                await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    def close(self):
+        """drops the connection (the read loop then ends); used to shut down the pool"""
+        if self.writer is not None:
+            self.writer.close()
+
+    def send_raw(self, line, channel=None, priority=CONTROL):
+        """queues a raw IRC line for the writer task (lines queued while disconnected are sent once connected)
+        Returns False if the line duplicates a chat line that is already waiting to be sent."""
+        if not self.scheduler.push(line, channel, priority):
+            return False
+        if self.outbound_ready is not None:
+            self.outbound_ready.set()
+        return True
+
+
+class IRCProtocol(asyncio.BufferedProtocol):
+    def __init__(self, connection):
+        """The transport side of a Connection. Data is received straight into the connection's LineFramer buffer,
+        so reading allocates nothing but the lines themselves. Also provides the parts of asyncio's StreamWriter
+        the connection uses (write, drain, close, wait_closed).
+        :param connection: the Connection that handles the received data
+        """
+        self.connection = connection
+        self.transport = None
+        self.received = False
+        loop = asyncio.get_running_loop()
+        self.done_reading = loop.create_future()  # set when the connection ends or the bot terminates
+        self.closed = loop.create_future()        # set when the socket has closed
+        self.writable = asyncio.Event()  # cleared while the transport's write buffer is full
+        self.writable.set()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def get_buffer(self, sizehint):
+        return self.connection.framer.view
+
+    def buffer_updated(self, nbytes):
+        self.received = True
+        self.connection.read_incoming(nbytes)
+        if self.connection.bot.terminate:
+            # stop reading; Connection.close_connection sends what's left to send and closes the connection
+            self.transport.pause_reading()
+            self.stop_reading()
+
+    def eof_received(self):
+        if not self.connection.bot.terminate:
+            print('connection ' + str(self.connection.number) + ' closed by server')
+        return False  # close the transport
+
+    def connection_lost(self, error):
+        if error is not None and not self.connection.bot.terminate:
+            print('connection ' + str(self.connection.number) + ' failed: ' + str(error))
+        self.writable.set()
+        self.stop_reading()
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+    def stop_reading(self):
+        if not self.done_reading.done():
+            self.done_reading.set_result(self.received)
+
+    async def finished(self):
+        """waits until the connection ends or the bot terminates; returns True if any data was received"""
+        return await asyncio.shield(self.done_reading)
+
+    def pause_writing(self):
+        self.writable.clear()
+
+    def resume_writing(self):
+        self.writable.set()
+
+    def write(self, data):
+        self.transport.write(data)
+
+    async def drain(self):
+        await self.writable.wait()
+        if self.transport.is_closing():
+            raise ConnectionResetError('connection lost')
+
+    def close(self):
+        self.transport.close()
+
+    async def wait_closed(self):
+        await asyncio.shield(self.closed)
+
+
+class JoinLimiter:
+    def __init__(self, joins=20, period=10):
+        """Paces JOINs across all of a bot's connections (Twitch allows 20 JOINs per 10 seconds per account)"""
+        self.bucket = TokenBucket(joins, period)
+
+    async def acquire(self):
+        while not self.bucket.ready(time.monotonic()):
+            await asyncio.sleep(self.bucket.wait(time.monotonic()))
+        self.bucket.take()
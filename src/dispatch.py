@@ -0,0 +1,41 @@
+class CommandIndex:
+    def __init__(self, names=()):
+        """Indexes command names by their first word, so finding the command a message starts with
+        costs one dict lookup no matter how many commands exist"""
+        self.index = {}  # first word -> lowercased command names starting with that word (longest first)
+        self.keys = {}   # lowercased command name -> the name as it was added (ex: a commands.json key)
+        for name in names:
+            self.add(name)
+
+    def __contains__(self, name):
+        name = name.lower()
+        return name in self.index.get(name.split(' ', 1)[0], ())
+
+    def add(self, name):
+        """adds a command name (names may contain spaces, ex: '!so long'); names are matched case-insensitively"""
+        key = name
+        name = name.lower()
+        self.keys[name] = key
+        names = self.index.setdefault(name.split(' ', 1)[0], [])
+        if name not in names:
+            names.append(name)
+            names.sort(key=len, reverse=True)
+
+    def remove(self, name):
+        name = name.lower()
+        key = name.split(' ', 1)[0]
+        names = self.index.get(key, [])
+        if name in names:
+            names.remove(name)
+            del self.keys[name]
+            if not names:
+                del self.index[key]
+
+    def match(self, message):
+        """returns a (command, arguments) tuple for the command the message starts with, or None.
+        The command is returned as it was added, whatever its case in the message."""
+        lowered = message.lower()
+        for name in self.index.get(lowered.split(' ', 1)[0], ()):
+            if lowered.startswith(name) and (len(lowered) == len(name) or lowered[len(name)] == ' '):
+                return self.keys[name], message[len(name):].lstrip()
+        return None
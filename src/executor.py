@@ -0,0 +1,106 @@
+import asyncio
+import concurrent.futures
+import time
+
+
+class CommandExecutor:
+    def __init__(self, workers=4, timeout=10, concurrency=2):
+        """Runs command functions on a thread pool, so a slow command can't stall the read loop.
+        Commands listed in `inline` (fast built-ins) are called directly, skipping the handoff.
+        Without an event loop, commands are called directly too, unless `background` is set: then they run on the
+        pool and the caller delivers their results by calling collect() (as worker processes do).
+        :param workers: the number of worker threads
+        :param timeout: default seconds to wait for a command's result before giving up on it
+        :param concurrency: default number of calls to the same command that may run at once
+        """
+        self.workers = workers
+        self.pool = None  # created on first use
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.inline = set()   # names of functions that run inline
+        self.timeouts = {}    # function name -> seconds, overriding the default timeout
+        self.limits = {}      # function name -> concurrent calls, overriding the default concurrency
+        self.running = {}     # function name -> calls currently running on the pool
+        self.background = False  # run commands on the pool even when there's no event loop (see collect)
+        self.wake = None         # optional function called from a pool thread whenever a background call finishes
+        self.waiting = []        # background calls: (function name, future, deadline, callback)
+        self.abandoned = []      # background calls that timed out: (function name, future)
+
+    def submit(self, func_name, func, arguments, callback):
+        """calls func(arguments) and passes the result to callback(result), which always runs on the event loop
+        (or inline, when no event loop is running, or from collect() in background mode). Returns False if the
+        command is already running as many times as its concurrency limit allows."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if (loop is None and not self.background) or func_name in self.inline:
+            callback(func(arguments))
+            return True
+        if self.running.get(func_name, 0) >= self.limits.get(func_name, self.concurrency):
+            return False
+        if self.pool is None:
+            self.pool = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix='command')
+        self.running[func_name] = self.running.get(func_name, 0) + 1
+        if loop is None:
+            future = self.pool.submit(func, arguments)
+            future.add_done_callback(self.finished)
+            deadline = time.monotonic() + self.timeouts.get(func_name, self.timeout)
+            self.waiting.append((func_name, future, deadline, callback))
+            return True
+        future = loop.run_in_executor(self.pool, func, arguments)
+        # the slot is released when the function actually returns, even if we stopped waiting for it
+        future.add_done_callback(lambda f: self.release(func_name))
+        loop.create_task(self.deliver(func_name, future, callback))
+        return True
+
+    async def deliver(self, func_name, future, callback):
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), self.timeouts.get(func_name, self.timeout))
+        except asyncio.TimeoutError:
+            print('command ' + func_name + ' timed out')
+            return
+        except Exception as error:
+            print('command ' + func_name + ' failed: ' + repr(error))
+            return
+        callback(result)
+
+    def finished(self, future):
+        wake = self.wake
+        if wake is not None:
+            wake()
+
+    def collect(self, now):
+        """passes the results of finished background calls to their callbacks, and gives up on calls that have
+        timed out. Returns the seconds until the next call times out, or None if none are running."""
+        waiting = []
+        for func_name, future, deadline, callback in self.waiting:
+            if future.done():
+                self.release(func_name)
+                try:
+                    callback(future.result())
+                except Exception as error:
+                    print('command ' + func_name + ' failed: ' + repr(error))
+            elif now >= deadline:
+                print('command ' + func_name + ' timed out')
+                self.abandoned.append((func_name, future))
+            else:
+                waiting.append((func_name, future, deadline, callback))
+        self.waiting = waiting
+        # the slot of a call that timed out is released when the function actually returns
+        for func_name, future in [call for call in self.abandoned if call[1].done()]:
+            self.abandoned.remove((func_name, future))
+            self.release(func_name)
+        if not waiting:
+            return None
+        return max(0, min(deadline for func_name, future, deadline, callback in waiting) - now)
+
+    def release(self, func_name):
+        self.running[func_name] -= 1
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        self.waiting = []
+        self.abandoned = []
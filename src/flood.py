@@ -0,0 +1,133 @@
+import collections
+import re
+import unicodedata
+
+WORD = re.compile(r'\w+')
+REPEATED_CHARACTERS = re.compile(r'(.)\1+')
+
+
+def fingerprint(message):
+    """returns (hash, length) of a normalized form of the message, so near-duplicates share a fingerprint:
+    case, punctuation, spacing, word order, repeated words and stretched letters ('loooool') are ignored.
+    Messages without any words (emoji, '???') are compared as they are, apart from case and spacing."""
+    normalized = unicodedata.normalize('NFKC', message).casefold()
+    words = sorted({REPEATED_CHARACTERS.sub(r'\1', word) for word in WORD.findall(normalized)})
+    text = ' '.join(words) if words else ' '.join(normalized.split())
+    return hash(text), len(text)
+
+
+class UserState:
+    __slots__ = ('times', 'fingerprint', 'repeats', 'muted_until', 'last')
+
+    def __init__(self):
+        self.times = collections.deque()    # times of the user's messages inside the window
+        self.fingerprint = None             # fingerprint of the user's last message
+        self.repeats = collections.deque()  # times the user sent that message in a row, inside the window
+        self.muted_until = 0                # no further action is taken against the user until then
+        self.last = 0
+
+
+class FloodDetector:
+    def __init__(self, window=10, user_limit=6, repeat_limit=3, pasta_limit=8, pasta_length=20, raid_rate=100,
+                 max_entries=100000):
+        """Detects users who flood a channel, repeat a message, or join in on copypasta spam.
+        Each check does a constant amount of work (amortized), and state for idle users and old messages expires
+        once it falls out of the window.
+        :param window: the sliding window, in seconds
+        :param user_limit: a user may send this many messages per window
+        :param repeat_limit: sending the same (or a near-identical) message this many times in a row, within the
+            window, is a repeat
+        :param pasta_limit: this many copies of one message in a channel per window is copypasta spam
+        :param pasta_length: shorter messages (emotes, 'lol') are never treated as copypasta
+        :param raid_rate: above this many messages per window in a channel, the repeat and copypasta limits halve
+        :param max_entries: the most users (and messages) tracked at once
+        """
+        self.window = window
+        self.user_limit = user_limit
+        self.repeat_limit = repeat_limit
+        self.pasta_limit = pasta_limit
+        self.pasta_length = pasta_length
+        self.raid_rate = raid_rate
+        self.max_entries = max_entries
+        self.timeout = '60s'                      # timeout length used by the bot when a check fails
+        self.users = collections.OrderedDict()    # (channel, username) -> UserState, least recently seen first
+        self.pastas = collections.OrderedDict()   # (channel, fingerprint) -> deque of times, oldest first
+        self.channels = {}                        # channel -> [per-second message counts, last second, total]
+
+    def expire(self, now):
+        cutoff = now - self.window
+        users, pastas = self.users, self.pastas
+        while users and (len(users) > self.max_entries or next(iter(users.values())).last < cutoff):
+            users.popitem(last=False)
+        while pastas and (len(pastas) > self.max_entries or next(iter(pastas.values()))[-1] < cutoff):
+            pastas.popitem(last=False)
+
+    def channel_rate(self, channel, now, count=False):
+        """the number of messages in the channel during the last window (counting this one, if count is True)"""
+        second = int(now)
+        state = self.channels.get(channel)
+        if state is None:
+            state = self.channels[channel] = [[0] * self.window, second, 0]
+        counts = state[0]
+        for elapsed in range(min(second - state[1], self.window)):
+            bucket = (state[1] + elapsed + 1) % self.window
+            state[2] -= counts[bucket]
+            counts[bucket] = 0
+        state[1] = max(second, state[1])
+        if count:
+            counts[second % self.window] += 1
+            state[2] += 1
+        return state[2]
+
+    def check(self, channel, username, message, now):
+        """records a message and returns the reason the user should be timed out ('flooding', 'repeating
+        messages' or 'copypasta spam'), or None"""
+        self.expire(now)
+        raid = self.channel_rate(channel, now, count=True) > self.raid_rate
+        key = (channel, username)
+        state = self.users.get(key)
+        if state is None:
+            state = self.users[key] = UserState()
+        else:
+            self.users.move_to_end(key)
+        state.last = now
+        if now < state.muted_until:
+            return None
+
+        reason = None
+        times = state.times
+        times.append(now)
+        while times[0] <= now - self.window:
+            times.popleft()
+        if len(times) > self.user_limit:
+            reason = 'flooding'
+
+        message_hash, length = fingerprint(message)
+        repeats = state.repeats
+        if message_hash != state.fingerprint:
+            state.fingerprint = message_hash
+            repeats.clear()
+        repeats.append(now)
+        while repeats[0] <= now - self.window:
+            repeats.popleft()
+        if len(repeats) >= (max(2, self.repeat_limit // 2) if raid else self.repeat_limit):
+            reason = reason or 'repeating messages'
+
+        if length >= self.pasta_length:
+            pasta_key = (channel, message_hash)
+            copies = self.pastas.get(pasta_key)
+            if copies is None:
+                copies = self.pastas[pasta_key] = collections.deque()
+            else:
+                self.pastas.move_to_end(pasta_key)
+            copies.append(now)
+            while copies[0] <= now - self.window:
+                copies.popleft()
+            if len(copies) >= (max(2, self.pasta_limit // 2) if raid else self.pasta_limit):
+                reason = reason or 'copypasta spam'
+
+        if reason:
+            state.muted_until = now + self.window
+            times.clear()
+            repeats.clear()
+        return reason
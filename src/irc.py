@@ -0,0 +1,131 @@
+"""
+Incremental IRC line framing and parsing
+Twitch sends CRLF-terminated lines that may span several recv() chunks, or arrive many to a chunk.
+With the twitch.tv/tags capability each line is prefixed by IRCv3 tags (user-id, badges, etc).
+"""
+
+TAG_ESCAPES = {':': ';', 's': ' ', '\\': '\\', 'r': '\r', 'n': '\n'}
+
+
+class LineFramer:
+    def __init__(self, buffer_size=4096, max_line=65536):
+        """Splits a byte stream into complete lines, receiving into one reusable buffer
+        :param buffer_size: the size of the receive buffer
+        :param max_line: a partial line longer than this is discarded (Twitch lines are at most ~8KB)
+        """
+        self.buffer = bytearray(buffer_size)  # reused by every read (see IRCProtocol.get_buffer)
+        self.view = memoryview(self.buffer)
+        self.pending = bytearray()            # bytes received after the last complete line
+        self.max_line = max_line
+
+    def feed(self, data):
+        """adds received bytes and returns the decoded lines they complete (without line endings)"""
+        pending = self.pending
+        pending += data
+        lines = []
+        start = 0
+        end = pending.find(b'\n')
+        while end != -1:
+            line_end = end - 1 if end > start and pending[end - 1] == 13 else end  # drop the \r
+            if line_end > start:
+                lines.append(pending[start:line_end].decode('utf-8', 'replace'))
+            start = end + 1
+            end = pending.find(b'\n', start)
+        if start:
+            del pending[:start]
+        if len(pending) > self.max_line:
+            del pending[:]
+        return lines
+
+
+class IRCMessage:
+    """A parsed IRC line: IRCv3 tags, prefix, command and parameters"""
+    __slots__ = ('tags', 'prefix', 'command', 'params')
+
+    def __init__(self, tags, prefix, command, params):
+        self.tags = tags
+        self.prefix = prefix
+        self.command = command
+        self.params = params
+
+    def __repr__(self):
+        return 'IRCMessage(%r, %r, %r, %r)' % (self.tags, self.prefix, self.command, self.params)
+
+    @property
+    def nick(self):
+        """the sender's username (the part of the prefix before '!')"""
+        return self.prefix.split('!', 1)[0]
+
+    @property
+    def channel(self):
+        """the target channel without its '#', or an empty string"""
+        if self.params and self.params[0].startswith('#'):
+            return self.params[0][1:]
+        return ''
+
+    @property
+    def trailing(self):
+        """the last parameter (the chat message for PRIVMSG and WHISPER)"""
+        if self.params:
+            return self.params[-1]
+        return ''
+
+    @property
+    def user_id(self):
+        return self.tags.get('user-id', '')
+
+    @property
+    def badges(self):
+        """the sender's badges as a dict, ex: {'moderator': '1', 'subscriber': '12'}"""
+        badges = {}
+        for badge in self.tags.get('badges', '').split(','):
+            if badge:
+                name, _, version = badge.partition('/')
+                badges[name] = version
+        return badges
+
+
+def unescape_tag(value):
+    if '\\' not in value:
+        return value
+    chars = []
+    i = 0
+    while i < len(value):
+        if value[i] == '\\':
+            if i + 1 < len(value):
+                chars.append(TAG_ESCAPES.get(value[i + 1], value[i + 1]))
+            i += 2
+        else:
+            chars.append(value[i])
+            i += 1
+    return ''.join(chars)
+
+
+def parse_message(line):
+    """parses a single IRC line into an IRCMessage in one pass"""
+    tags = {}
+    pos = 0
+    if line.startswith('@'):
+        pos = line.find(' ')
+        if pos == -1:
+            pos = len(line)
+        for tag in line[1:pos].split(';'):
+            key, _, value = tag.partition('=')
+            tags[key] = unescape_tag(value)
+        while line.startswith(' ', pos):
+            pos += 1
+    prefix = ''
+    if line.startswith(':', pos):
+        end = line.find(' ', pos)
+        if end == -1:
+            end = len(line)
+        prefix = line[pos + 1:end]
+        pos = end + 1
+    trailing = line.find(' :', pos)
+    if trailing == -1:
+        params = line[pos:].split()
+    else:
+        params = line[pos:trailing].split()
+        params.append(line[trailing + 2:])
+    command = params.pop(0).upper() if params else ''
+    return IRCMessage(tags, prefix, command, params)
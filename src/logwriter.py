@@ -0,0 +1,126 @@
+import datetime
+import os
+import threading
+import time
+from archive import ArchiveWriter
+from clock import clock
+
+
+class LogWriter:
+    def __init__(self, directory='local_logs', flush_size=65536, flush_interval=5, archive=False):
+        """Buffers chat log lines in memory and appends them to each channel's daily log file in batches,
+        keeping one open file per channel.
+        :param directory: the folder logs are kept in (one sub-folder per channel)
+        :param flush_size: the number of buffered characters that triggers a flush
+        :param flush_interval: the maximum number of seconds a line stays buffered
+        :param archive: if True, write compressed, indexed archives (see archive.py) instead of .txt files
+        """
+        self.directory = directory
+        self.archive = archive
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.pending = {}        # channel -> lines buffered for the current day
+        self.pending_size = 0
+        self.ready = []          # (day, pending) batches waiting to be written
+        self.handles = {}        # channel -> (day, open log file)
+        self.lock = threading.Lock()     # guards the buffers; held only briefly by write()
+        self.io_lock = threading.Lock()  # serializes flushes, so only one thread touches the files
+        self.wake = threading.Event()
+        self.thread = None
+        self.closed = False
+        self.last_flush = time.monotonic()
+        self.day = ''
+        self.rotate_at = 0       # time.time() of the next midnight, when lines start going to a new file
+        self.set_day()
+
+    def set_day(self):
+        """computes the file name suffix for today and the time of the next rotation"""
+        month, day, year, date = clock.date
+        self.day = month + "_" + day + "_" + year
+        midnight = datetime.datetime.combine(date + datetime.timedelta(days=1), datetime.time())
+        self.rotate_at = midnight.timestamp()
+
+    def start(self):
+        """starts flushing from a background thread"""
+        self.closed = False
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='log-writer', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while not self.closed:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.flush()
+
+    def write(self, channel, line):
+        """buffers a line for the channel's log file"""
+        with self.lock:
+            if time.time() >= self.rotate_at:
+                self.seal()
+                self.set_day()
+            self.pending.setdefault(channel, []).append(line)
+            self.pending_size += len(line) + 1
+            full = self.pending_size >= self.flush_size or self.ready
+        if self.thread is not None:
+            if full:
+                self.wake.set()
+        elif full or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()  # no background thread: flush inline
+
+    def seal(self):
+        """moves the buffered lines into a batch for the current day (the caller must hold self.lock)"""
+        if self.pending:
+            self.ready.append((self.day, self.pending))
+            self.pending = {}
+            self.pending_size = 0
+
+    def flush(self):
+        """writes every buffered line to disk"""
+        with self.lock:
+            self.seal()
+            batches, self.ready = self.ready, []
+        with self.io_lock:
+            written = set()
+            for day, pending in batches:
+                for channel, lines in pending.items():
+                    self.open_log(channel, day).write('\n'.join(lines) + '\n')
+                    written.add(channel)
+            for channel in list(self.handles):
+                day, log_file = self.handles[channel]
+                if day != self.day:  # the day has rolled over; close yesterday's files
+                    log_file.close()
+                    del self.handles[channel]
+                elif channel in written:
+                    log_file.flush()
+            self.last_flush = time.monotonic()
+
+    def open_log(self, channel, day):
+        """returns the open log file for the channel and day, opening it (and closing the old one) if needed"""
+        handle = self.handles.get(channel)
+        if handle and handle[0] == day:
+            return handle[1]
+        if handle:
+            handle[1].close()
+        folder = os.path.join(self.directory, channel)
+        os.makedirs(folder, exist_ok=True)
+        if self.archive:
+            date = datetime.datetime.strptime(day, '%B_%d_%Y').date()
+            log_file = ArchiveWriter(os.path.join(folder, channel + "_" + day + ".arc"), channel, date)
+        else:
+            log_file = open(os.path.join(folder, channel + "_" + day + ".txt"), "a", encoding="utf-8")
+        self.handles[channel] = (day, log_file)
+        return log_file
+
+    def close(self):
+        """stops the background thread, writes anything still buffered and closes the log files"""
+        self.closed = True
+        if self.thread is not None:
+            self.wake.set()
+            self.thread.join()
+            self.thread = None
+        self.flush()
+        with self.io_lock:
+            for day, log_file in self.handles.values():
+                log_file.close()
+            self.handles = {}
@@ -0,0 +1,96 @@
+import unicodedata
+
+
+class PhraseMatcher:
+    def __init__(self, phrases=(), casefold=False, normalize=None):
+        """An Aho-Corasick automaton that finds every phrase contained in a message in a single pass.
+        :param phrases: an optional iterable of phrases to compile
+        :param casefold: if True, matching ignores case (phrases are folded once, when added)
+        :param normalize: an optional unicodedata normal form (ex: 'NFKC') applied before matching
+        """
+        self.casefold = casefold
+        self.normalize = normalize
+        self.goto = [{}]       # trie transitions: node -> {character: node}
+        self.fail = [0]        # failure links: node -> longest proper suffix that is also a trie node
+        self.out_link = [0]    # node -> nearest node on the failure chain that ends a phrase
+        self.output = [set()]  # node -> the original phrases that end at this node
+        self.nodes = {}        # phrase -> the trie node it ends at
+        self.dirty = False     # True when failure links need to be rebuilt
+        for phrase in phrases:
+            self.add(phrase)
+
+    def __contains__(self, phrase):
+        return phrase in self.nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def fold(self, text):
+        """applies the matcher's normalization and case folding to a string"""
+        if self.normalize:
+            text = unicodedata.normalize(self.normalize, text)
+        if self.casefold:
+            text = text.casefold()
+        return text
+
+    def add(self, phrase):
+        """adds a phrase to the trie; failure links are rebuilt lazily on the next search"""
+        if not phrase or phrase in self.nodes:
+            return
+        node = 0
+        for char in self.fold(phrase):
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.out_link.append(0)
+                self.output.append(set())
+            node = next_node
+        self.output[node].add(phrase)
+        self.nodes[phrase] = node
+        self.dirty = True
+
+    def remove(self, phrase):
+        """removes a phrase; its trie nodes are kept and reused if the phrase is added again"""
+        node = self.nodes.pop(phrase, None)
+        if node is not None:
+            self.output[node].discard(phrase)
+            self.dirty = True
+
+    def build(self):
+        """recomputes failure and output links with a breadth-first walk of the trie"""
+        queue = []
+        for node in self.goto[0].values():
+            self.fail[node] = 0
+            self.out_link[node] = 0
+            queue.append(node)
+        for node in queue:
+            for char, child in self.goto[node].items():
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                fail = self.goto[state].get(char, 0)
+                self.fail[child] = fail
+                self.out_link[child] = fail if self.output[fail] else self.out_link[fail]
+                queue.append(child)
+        self.dirty = False
+
+    def find_all(self, message):
+        """returns the set of phrases found in the message"""
+        if self.dirty:
+            self.build()
+        found = set()
+        goto, fail, out_link, output = self.goto, self.fail, self.out_link, self.output
+        node = 0
+        # normalize the whole message at once: forms like NFKC combine characters (ex: 'e' + a combining accent)
+        for char in self.fold(message):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            match = node if output[node] else out_link[node]
+            while match:
+                found.update(output[match])
+                match = out_link[match]
+        return found
@@ -0,0 +1,108 @@
+import json
+import os
+import time
+
+
+class Histogram:
+    """Counts latencies in power-of-two nanosecond buckets, so recording is a few integer operations"""
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.buckets = [0] * 64  # bucket i counts latencies below 2**i nanoseconds
+
+    def record(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.buckets[min(elapsed.bit_length(), 63)] += 1
+
+    def merge(self, other):
+        """adds another histogram's latencies to this one"""
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        for i, count in enumerate(other.buckets):
+            self.buckets[i] += count
+
+    def percentile(self, p):
+        """returns an upper bound (in nanoseconds) for the p-th percentile latency"""
+        target = self.count * p / 100
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return min(2 ** i, self.max)
+        return 0
+
+    def report(self):
+        return {'count': self.count,
+                'mean_us': round(self.total / self.count / 1000, 1) if self.count else 0,
+                'p50_us': round(self.percentile(50) / 1000, 1),
+                'p99_us': round(self.percentile(99) / 1000, 1),
+                'max_us': round(self.max / 1000, 1)}
+
+
+class Metrics:
+    def __init__(self):
+        """Counters and latency histograms for each stage of the message pipeline, overall and per channel"""
+        self.started = time.time()
+        self.counters = {}  # name -> count
+        self.stages = {}    # stage -> Histogram
+        self.channels = {}  # (stage, channel) -> Histogram
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self, stage, elapsed, channel=None):
+        """records that a stage took `elapsed` nanoseconds (measure with time.perf_counter_ns)"""
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = Histogram()
+        histogram.record(elapsed)
+        if channel:
+            histogram = self.channels.get((stage, channel))
+            if histogram is None:
+                histogram = self.channels[(stage, channel)] = Histogram()
+            histogram.record(elapsed)
+
+    def merge(self, other):
+        """adds the counts and latencies of another Metrics (ex: a worker process's) to this one"""
+        for name, n in other.counters.items():
+            self.count(name, n)
+        for mine, theirs in ((self.stages, other.stages), (self.channels, other.channels)):
+            for key, histogram in theirs.items():
+                if key not in mine:
+                    mine[key] = Histogram()
+                mine[key].merge(histogram)
+
+    def summary(self):
+        """a one-line summary short enough for a whisper"""
+        uptime = max(time.time() - self.started, 1)
+        parts = []
+        for stage, histogram in self.stages.items():
+            parts.append(stage + ' ' + str(histogram.count) + ' (' + str(round(histogram.count / uptime, 1))
+                         + '/s) p50 ' + str(histogram.report()['p50_us']) + 'us p99 '
+                         + str(histogram.report()['p99_us']) + 'us')
+        return ' | '.join(parts) or 'no messages yet'
+
+    def report(self):
+        channels = {}
+        for (stage, channel), histogram in self.channels.items():
+            channels.setdefault(channel, {})[stage] = histogram.report()
+        return {'uptime_s': round(time.time() - self.started),
+                'counters': self.counters,
+                'stages': {stage: histogram.report() for stage, histogram in self.stages.items()},
+                'channels': channels}
+
+    def write(self, file_name):
+        """writes the report to a JSON file (replacing it, so readers never see a partial file)"""
+        folder = os.path.dirname(file_name)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(file_name + '.tmp', 'w') as f:
+            json.dump(self.report(), f, indent=1)
+        os.replace(file_name + '.tmp', file_name)
@@ -0,0 +1,52 @@
+import collections
+
+
+def cacheable(ttl=None):
+    """Marks a command function as pure: its result depends only on its arguments, so the bot may reuse a
+    recent result instead of calling it again.
+    :param ttl: seconds a result is reused for (default: the cache's ttl)
+    """
+    def mark(func):
+        func.cacheable = True
+        func.cache_ttl = ttl
+        return func
+    return mark
+
+
+class ResponseCache:
+    def __init__(self, maxsize=1024, ttl=60):
+        """Results of cacheable command functions, evicted least recently used first and expiring after a ttl
+        :param maxsize: the most results kept
+        :param ttl: default seconds a result is kept
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = collections.OrderedDict()  # key -> (expiry time, result), least recently used first
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def key(channel, func_name, arguments):
+        """the cache key for a call; arguments that differ only in spacing share a key"""
+        return channel, func_name, ' '.join(arguments.split())
+
+    def get(self, key, now):
+        """returns (True, result) for a live entry, otherwise (False, None)"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] <= now:
+            del self.entries[key]
+            return False, None
+        self.entries.move_to_end(key)
+        return True, entry[1]
+
+    def put(self, key, result, now, ttl=None):
+        self.entries[key] = (now + (self.ttl if ttl is None else ttl), result)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
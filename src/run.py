@@ -19,5 +19,9 @@ if __name__ == "__main__":
     twitch_bot = Bot((name, oauth), channels, admins, record)
 
     # twitch_bot.is_moderator = True  # if bot is a moderator to the channel(s)
+    # twitch_bot.worker_processes = 4  # handle chat on 4 CPU cores (for bots in many busy channels)
     # call run() to run the bot
     twitch_bot.run()
+    # to run several bots in one process (sharing one event loop), use run_bots instead:
+    # from bot import run_bots
+    # run_bots([twitch_bot, another_bot])
@@ -0,0 +1,193 @@
+"""
+Rate-limited scheduling of outbound IRC lines
+Twitch mutes accounts that send too many messages (https://dev.twitch.tv/docs/irc#rate-limits):
+20 messages per 30 seconds per account (across all of its connections), or 100 if the bot is a moderator, and
+non-moderators are also limited to roughly one message per second in each channel.
+"""
+import collections
+import heapq
+import itertools
+import time
+
+CONTROL = 0     # PASS, NICK, PONG, etc: not rate limited, always sent first
+MODERATION = 1  # /timeout, /untimeout and other chat commands
+CHAT = 2        # ordinary chat replies and whispers
+
+
+class TokenBucket:
+    """Allows up to `capacity` events per `period` seconds (in bursts of up to `capacity`)"""
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated')
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = None
+
+    def refill(self, now):
+        if self.updated is None:
+            self.updated = now
+        elif now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def ready(self, now):
+        self.refill(now)
+        return self.tokens >= 1
+
+    def take(self):
+        self.tokens -= 1
+
+    def wait(self, now):
+        """seconds until the next token is available"""
+        self.refill(now)
+        return max(0, (1 - self.tokens) / self.rate)
+
+
+class ChannelQueue:
+    """The queued lines of one priority, kept per channel. Channels take turns: those that may be able to send
+    wait in `ready`, in order, and those held back by their channel's limit wait in a heap, keyed by the time
+    their limit allows another line, so neither sending nor waiting scans the queued lines."""
+    __slots__ = ('lines', 'ready', 'waiting', 'length')
+
+    def __init__(self):
+        self.lines = {}                   # channel -> deque of (time queued, line)
+        self.ready = collections.deque()  # channels whose next line may be sendable now
+        self.waiting = []                 # heap of (time the channel's limit allows a line, order, channel)
+        self.length = 0
+
+
+class OutboundScheduler:
+    # (messages, seconds) for non-moderators and moderators
+    CONNECTION_LIMITS = {False: (20, 30), True: (100, 30)}
+    CHANNEL_LIMITS = {False: (1, 1), True: None}
+    WHISPER_LIMIT = (3, 1)
+
+    def __init__(self, is_moderator=False, max_chat_age=30, max_chat_depth=20):
+        """Queues outbound lines by priority and releases them as the rate limits allow.
+        Identical chat lines queued for the same channel are merged into one.
+        :param max_chat_age: seconds a chat line may wait; older ones are dropped instead of sent late
+        :param max_chat_depth: chat lines queued per channel; the oldest is dropped to make room for a new one
+        """
+        self.control = collections.deque()
+        self.queues = {MODERATION: ChannelQueue(), CHAT: ChannelQueue()}
+        self.queued = set()  # (channel, line) of every queued chat line, for merging duplicates
+        self.order = itertools.count()  # breaks ties between channels that become ready at the same time
+        self.max_chat_age = max_chat_age
+        self.max_chat_depth = max_chat_depth
+        self.dropped = 0     # chat lines dropped for their age or depth (the connection counts and resets this)
+        self.is_moderator = is_moderator
+        self.connection = None
+        self.channel_buckets = {}
+        self.configure(is_moderator)
+
+    def __len__(self):
+        return len(self.control) + sum(queue.length for queue in self.queues.values())
+
+    def configure(self, is_moderator, shared=None):
+        """applies the moderator or non-moderator rate limits
+        :param shared: an optional dict (is_moderator -> TokenBucket) of message limits shared with other
+            schedulers, since Twitch limits messages per account rather than per connection
+        """
+        self.is_moderator = is_moderator
+        if shared is None:
+            self.connection = TokenBucket(*self.CONNECTION_LIMITS[is_moderator])
+        else:
+            if is_moderator not in shared:
+                shared[is_moderator] = TokenBucket(*self.CONNECTION_LIMITS[is_moderator])
+            self.connection = shared[is_moderator]
+        self.channel_buckets = {}
+        for queue in self.queues.values():  # the new limits may let waiting channels send sooner
+            queue.ready.extend(channel for _, _, channel in sorted(queue.waiting))
+            queue.waiting = []
+
+    def channel_bucket(self, channel):
+        """returns the channel's token bucket, or None if the channel has no limit of its own"""
+        bucket = self.channel_buckets.get(channel)
+        if bucket is None:
+            limit = self.WHISPER_LIMIT if channel == 'jtv' else self.CHANNEL_LIMITS[self.is_moderator]
+            if limit is None:
+                return None
+            bucket = self.channel_buckets[channel] = TokenBucket(*limit)
+        return bucket
+
+    def push(self, line, channel=None, priority=CHAT, now=None):
+        """queues a line; returns False if an identical chat line is already waiting to be sent
+        :param now: the time.monotonic() the line was queued at (default: now)"""
+        if priority == CONTROL:
+            self.control.append(line)
+            return True
+        if priority == CHAT:
+            if (channel, line) in self.queued:
+                return False
+            self.queued.add((channel, line))
+        queue = self.queues[priority]
+        lines = queue.lines.get(channel)
+        if lines is None:
+            lines = queue.lines[channel] = collections.deque()
+            queue.ready.append(channel)
+        elif priority == CHAT and len(lines) >= self.max_chat_depth:
+            self.drop(channel, lines)
+            queue.length -= 1
+        lines.append((time.monotonic() if now is None else now, line))
+        queue.length += 1
+        return True
+
+    def drop(self, channel, lines):
+        """drops the oldest of a channel's queued chat lines"""
+        self.queued.discard((channel, lines.popleft()[1]))
+        self.dropped += 1
+
+    def pop_ready(self, now):
+        """removes and returns every queued line that can be sent now, highest priority first"""
+        ready_lines = list(self.control)
+        self.control.clear()
+        for priority in (MODERATION, CHAT):
+            queue = self.queues[priority]
+            while queue.waiting and queue.waiting[0][0] <= now:
+                queue.ready.append(heapq.heappop(queue.waiting)[2])
+            while queue.ready and self.connection.ready(now):
+                channel = queue.ready.popleft()
+                lines = queue.lines[channel]
+                if priority == CHAT:
+                    while lines and now - lines[0][0] > self.max_chat_age:
+                        self.drop(channel, lines)
+                        queue.length -= 1
+                    if not lines:
+                        del queue.lines[channel]
+                        continue
+                bucket = self.channel_bucket(channel) if channel else None
+                if bucket is not None and not bucket.ready(now):
+                    heapq.heappush(queue.waiting, (now + bucket.wait(now), next(self.order), channel))
+                    continue
+                self.connection.take()
+                if bucket is not None:
+                    bucket.take()
+                line = lines.popleft()[1]
+                queue.length -= 1
+                if priority == CHAT:
+                    self.queued.discard((channel, line))
+                ready_lines.append(line)
+                if not lines:
+                    del queue.lines[channel]
+                elif bucket is None or bucket.ready(now):
+                    queue.ready.append(channel)  # its turn comes again after the other ready channels
+                else:
+                    heapq.heappush(queue.waiting, (now + bucket.wait(now), next(self.order), channel))
+        return ready_lines
+
+    def next_ready(self, now):
+        """seconds until a queued line can be sent, or None if nothing is queued"""
+        if self.control:
+            return 0
+        wait = None
+        for queue in self.queues.values():
+            if queue.ready:
+                wait = 0
+            elif queue.waiting:
+                channel_wait = max(0, queue.waiting[0][0] - now)
+                if wait is None or channel_wait < wait:
+                    wait = channel_wait
+        if wait is None:
+            return None
+        return max(wait, self.connection.wait(now))
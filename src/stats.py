@@ -0,0 +1,184 @@
+"""
+Live chat statistics
+Every chat message the bot handles is counted into a fixed-size, per-minute rate series for its channel, and
+into bounded heavy-hitter counters for the channel's chatters and emotes. Memory use per channel is constant,
+however busy the channel is. At startup the counts can be backfilled from the channel's logs (see backfill).
+"""
+import array
+import collections
+import datetime
+import glob
+import os
+import re
+import time
+import archive
+
+LOG_LINE = re.compile(r'^\[([0-9]+):([0-9]{2}):[0-9]{2}\] ([^:\n]*): ?(.*)$', re.M)
+
+
+def emote_names(message, emotes_tag):
+    """the distinct emotes in a message, from its IRCv3 emotes tag (ex: '25:0-4,12-16/1902:6-10').
+    Without a tag (ex: when reading logs), words containing a capital letter, like Kappa or LUL, are used."""
+    if emotes_tag is None:
+        return {word for word in message.split() if len(word) > 2 and word.isalnum() and word != word.lower()}
+    names = set()
+    for emote in emotes_tag.split('/'):
+        ranges = emote.partition(':')[2]
+        if ranges:
+            start, _, end = ranges.split(',')[0].partition('-')
+            names.add(message[int(start):int(end) + 1])
+    return names
+
+
+class HeavyHitters:
+    def __init__(self, size=100):
+        """Approximate counts of the most frequent keys, keeping at most `size` keys (the Misra-Gries summary).
+        Any key seen more than 1/size of the time is kept; counts may be underestimated by at most total/size.
+        Adding a key is O(1), amortized."""
+        self.size = size
+        self.counts = {}
+
+    def add(self, key, count=1):
+        counts = self.counts
+        if key in counts:
+            counts[key] += count
+        elif len(counts) < self.size:
+            counts[key] = count
+        else:
+            # no room: take the smallest count (or this key's count, if smaller) off every key
+            decrement = min(min(counts.values()), count)
+            for other in list(counts):
+                counts[other] -= decrement
+                if not counts[other]:
+                    del counts[other]
+            if count > decrement:
+                counts[key] = count - decrement
+
+    def top(self, n=5):
+        """the n keys with the highest counts, as (key, count), highest first"""
+        return sorted(self.counts.items(), key=lambda item: -item[1])[:n]
+
+
+class ChannelStats:
+    __slots__ = ('counts', 'minute', 'first', 'users', 'emotes')
+
+    def __init__(self, minutes, top_size, minute):
+        self.counts = array.array('L', bytes(array.array('L').itemsize * minutes))  # messages per minute, circular
+        self.minute = minute   # the newest minute in counts (minutes since the epoch)
+        self.first = minute    # the oldest minute with data
+        self.users = HeavyHitters(top_size)
+        self.emotes = HeavyHitters(top_size)
+
+    def advance(self, minute):
+        """moves the series forward to the given minute, clearing the buckets it passes"""
+        size = len(self.counts)
+        for elapsed in range(min(minute - self.minute, size)):
+            self.counts[(self.minute + elapsed + 1) % size] = 0
+        self.minute = max(minute, self.minute)
+
+
+class ChatStats:
+    def __init__(self, minutes=60, top_size=100):
+        """Per-channel message rates, top chatters and top emotes
+        :param minutes: the length of each channel's rate series
+        :param top_size: the number of users (and emotes) each channel's heavy-hitter counters keep
+        """
+        self.minutes = minutes
+        self.top_size = top_size
+        self.channels = {}        # channel -> ChannelStats
+        self.backfilled = set()   # channels already read from the logs
+
+    def channel(self, channel, minute):
+        stats = self.channels.get(channel)
+        if stats is None:
+            stats = self.channels[channel] = ChannelStats(self.minutes, self.top_size, minute)
+        return stats
+
+    def add(self, channel, username, message, now=None, emotes_tag=None):
+        """counts a chat message
+        :param now: the message's time (time.time(); default: now)
+        :param emotes_tag: the message's IRCv3 emotes tag, if it has one
+        """
+        minute = int(time.time() if now is None else now) // 60
+        stats = self.channel(channel, minute)
+        stats.advance(minute)
+        stats.counts[minute % self.minutes] += 1
+        stats.users.add(username)
+        for name in emote_names(message, emotes_tag):
+            stats.emotes.add(name)
+
+    def rates(self, channel, now=None):
+        """returns (messages in the last full minute, average messages per minute over the series)"""
+        minute = int(time.time() if now is None else now) // 60
+        stats = self.channels.get(channel)
+        if stats is None:
+            return 0, 0.0
+        stats.advance(minute)
+        span = max(1, min(self.minutes, minute - stats.first + 1))
+        return stats.counts[(minute - 1) % self.minutes], sum(stats.counts) / span
+
+    def summary(self, channel, now=None, n=5):
+        """a one-line summary of a channel's stats, short enough for chat"""
+        stats = self.channels.get(channel)
+        if stats is None:
+            return "no stats for #" + channel + " yet"
+        last, average = self.rates(channel, now)
+        chatters = ', '.join(user + ' (' + str(count) + ')' for user, count in stats.users.top(n))
+        emotes = ', '.join(name + ' (' + str(count) + ')' for name, count in stats.emotes.top(n))
+        return ('#' + channel + ': ' + str(last) + ' msgs in the last minute, ' + str(round(average, 1)) +
+                '/min over ' + str(self.minutes) + ' min | top chatters: ' + (chatters or 'none') +
+                ' | top emotes: ' + (emotes or 'none'))
+
+    def backfill(self, directory, channels, now=None, exclude=()):
+        """counts today's and yesterday's logged messages (.txt or .arc) for each channel, reading each log file
+        in one pass. Channels already backfilled are skipped.
+        :param directory: the folder logs are kept in (one sub-folder per channel)
+        :param exclude: usernames to leave out, such as the bot's own
+        """
+        now = time.time() if now is None else now
+        today = datetime.date.fromtimestamp(now)
+        days = {today - datetime.timedelta(days=1), today}
+        for channel in channels:
+            if channel in self.backfilled:
+                continue
+            self.backfilled.add(channel)
+            file_names = [name for name in glob.glob(os.path.join(directory, channel, channel + '_*'))
+                          if name.endswith(('.txt', '.arc')) and archive.file_date(name) in days]
+            for file_name in sorted(file_names, key=archive.file_date):
+                self.add_log(channel, file_name, now, exclude)
+
+    def add_log(self, channel, file_name, now, exclude=()):
+        """counts the messages of one log file, in bulk"""
+        if file_name.endswith('.arc'):
+            text = archive.read_text(file_name)
+        else:
+            with open(file_name, encoding='utf-8') as f:
+                text = f.read()
+        date = archive.file_date(file_name)
+        day_start = int(time.mktime(date.timetuple())) // 60  # local midnight, in minutes since the epoch
+        now_minute = int(now) // 60
+        minutes = collections.Counter()
+        users = collections.Counter()
+        emotes = collections.Counter()
+        for hour, minute, username, message in LOG_LINE.findall(text):
+            if username in exclude:
+                continue
+            minutes[day_start + int(hour) * 60 + int(minute)] += 1
+            users[username] += 1
+            emotes.update(emote_names(message, None))
+        if not minutes:
+            return
+        stats = self.channel(channel, now_minute)
+        stats.advance(now_minute)
+        for minute, count in minutes.items():
+            if now_minute - self.minutes < minute <= now_minute:
+                stats.counts[minute % self.minutes] += count
+        stats.first = min(stats.first, max(min(minutes), now_minute - self.minutes + 1))
+        # the biggest counts go in first, so the summary keeps them
+        for username, count in users.most_common():
+            stats.users.add(username, count)
+        for name, count in emotes.most_common():
+            stats.emotes.add(name, count)
+
+
+chat_stats = ChatStats()  # shared by every bot in the process, like the clock
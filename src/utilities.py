@@ -1,4 +1,6 @@
+import collections
 import datetime
+import sys
 
 
 class LogDate:
@@ -88,6 +90,181 @@ class PhiQueue:
         return len(self.items)
 
 
+class RingBuffer:
+    def __init__(self, initials=None, maxsize=None):
+        """A fixed-capacity queue; once full, each put overwrites the oldest item in O(1)"""
+        self.maxsize = PhiQueue.config_max(maxsize)
+        self.items = []  # grows up to capacity, then becomes a circular store
+        self.head = 0    # position of the oldest item
+        self.count = 0
+        if initials:
+            self.put(initials)
+
+    def __repr__(self):
+        return str(list(self))
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        items, capacity = self.items, len(self.items)
+        for n in range(self.count):
+            yield items[(self.head + n) % capacity]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(self)[i]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError('RingBuffer index out of range')
+        return self.items[(self.head + i) % len(self.items)]
+
+    def capacity(self):
+        if self.maxsize:
+            return self.maxsize
+        return 536870912
+
+    def is_empty(self):
+        return self.count == 0
+
+    def is_full(self):
+        return self.count >= self.capacity()
+
+    def index(self, i):
+        return list(self).index(i)
+
+    def pop(self, i=1):
+        """discards the i oldest items"""
+        for n in range(min(i, self.count)):
+            self.items[self.head] = None
+            self.head = (self.head + 1) % len(self.items)
+            self.count -= 1
+        if self.count == 0:
+            self.clear()
+
+    def clear(self):
+        self.items = []
+        self.head = 0
+        self.count = 0
+
+    def put(self, i):
+        """appends an item, returning the evicted (oldest) item if the buffer was full"""
+        if i and type(i) == list:
+            for item in i:
+                self.put(item)
+        elif not i:
+            self.clear()
+        elif self.count < len(self.items):
+            self.items[(self.head + self.count) % len(self.items)] = i
+            self.count += 1
+        elif len(self.items) < self.capacity():
+            if self.head:
+                self.items = list(self)
+                self.head = 0
+            self.items.append(i)
+            self.count += 1
+        else:
+            evicted = self.items[self.head]
+            self.items[self.head] = i
+            self.head = (self.head + 1) % len(self.items)
+            return evicted
+
+    def set_maxsize(self, i, reset=True):
+        self.maxsize = self.config_max(i)
+        if reset:
+            items = list(self)  # copy original item list
+            self.clear()
+            self.put(items)
+
+    config_max = staticmethod(PhiQueue.config_max)
+
+    def size(self):
+        return self.count
+
+
+class ChatHistory(RingBuffer):
+    def __init__(self, initials=None, maxsize=None):
+        """A RingBuffer of ChatRecords, indexed by username and by channel.
+        Each index entry holds a user's (or channel's) records oldest first; since the buffer always evicts its
+        oldest record, eviction only ever removes the first record of an entry."""
+        self.by_user = {}     # username -> deque of that user's records
+        self.by_channel = {}  # channel -> deque of that channel's records
+        RingBuffer.__init__(self, initials, maxsize)
+
+    def put(self, i):
+        if i and type(i) == list:
+            for item in i:
+                self.put(item)
+            return
+        evicted = RingBuffer.put(self, i)
+        if i:
+            self.by_user.setdefault(i.username, collections.deque()).append(i)
+            self.by_channel.setdefault(i.channel, collections.deque()).append(i)
+        if evicted is not None:
+            self.unindex(evicted)
+        return evicted
+
+    def pop(self, i=1):
+        for n in range(min(i, self.count)):
+            record = self[0]
+            RingBuffer.pop(self, 1)
+            self.unindex(record)
+
+    def clear(self):
+        RingBuffer.clear(self)
+        self.by_user = {}
+        self.by_channel = {}
+
+    def unindex(self, record):
+        for index, key in ((self.by_user, record.username), (self.by_channel, record.channel)):
+            records = index.get(key)
+            if records:
+                records.popleft()
+                if not records:
+                    del index[key]
+
+    def user_messages(self, username, channel=None):
+        """yields the user's records, newest first (optionally only those in one channel)"""
+        for record in reversed(self.by_user.get(username, ())):
+            if channel is None or record.channel == channel:
+                yield record
+
+    def channel_messages(self, channel, limit=None):
+        """returns up to `limit` of the channel's most recent records, newest first"""
+        records = self.by_channel.get(channel, ())
+        if limit is None or limit >= len(records):
+            return list(reversed(records))
+        return [records[-n] for n in range(1, limit + 1)]
+
+    def last_message(self, username, channel=None):
+        """the user's most recent record (optionally in one channel), or None"""
+        return next(self.user_messages(username, channel), None)
+
+
+class ChatRecord:
+    """A compact chat history entry; channel and user names are interned so repeats share one string.
+    is_mod records whether the sender was a moderator or the broadcaster, which moderation leaves alone."""
+    __slots__ = ('channel', 'timestamp', 'username', 'message', 'is_mod')
+
+    def __init__(self, channel, timestamp, username, message, is_mod=False):
+        self.channel = sys.intern(channel)
+        self.timestamp = sys.intern(timestamp)
+        self.username = sys.intern(username)
+        self.message = message
+        self.is_mod = is_mod
+
+    def __repr__(self):
+        return repr(tuple(self))
+
+    def __iter__(self):
+        # unpacks like the (channel, timestamp, username, message) tuples history used to hold
+        yield self.channel
+        yield self.timestamp
+        yield self.username
+        yield self.message
+
+
 if __name__ == "__main__":
     pq = PhiQueue()
     print(pq)
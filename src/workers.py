@@ -0,0 +1,253 @@
+"""
+Multi-core message handling
+The bot's connections only frame lines and route chat messages; each channel is hashed to one of a pool of
+worker processes, which run the handle_message pipeline (moderation, commands, logging) for their channels.
+A channel's messages always go to the same worker, in order. Lines the workers send are passed back to the
+bot's connections over a queue. Workers share commands.json and prohibited.json, and pick up changes made by
+the other workers (or by hand) the same way a single bot does (see JSONStore.sync).
+Every few seconds, each worker also reports its metrics and its channels' chat stats to the bot, which merges
+them: whispered !metrics covers every worker, and !stats for a channel handled by another worker is answered
+from the bot's merged stats.
+"""
+import multiprocessing
+import queue
+import threading
+import time
+import zlib
+import commands
+from bot import Bot
+from scheduler import CONTROL
+
+# Settings copied to every worker: bot attributes, and attributes of the bot's helpers (helper.attribute)
+SETTINGS = ['is_moderator', 'user_cooldown', 'command_cooldown', 'command_cooldowns', 'verbose', 'retro_window',
+            'flood', 'config_interval', 'reply_window', 'reply_windows',
+            'executor.workers', 'executor.timeout', 'executor.concurrency', 'executor.inline', 'executor.timeouts',
+            'executor.limits', 'response_cache.maxsize', 'response_cache.ttl', 'log_writer.directory',
+            'log_writer.flush_size', 'log_writer.flush_interval', 'log_writer.archive', 'chat_stats.minutes',
+            'chat_stats.top_size']
+REPORT_INTERVAL = 5  # seconds between a worker's metrics and stats reports
+
+
+class WorkerBot(Bot):
+    """A Bot that runs in a worker process, handing its outbound lines back to the bot that owns the connections"""
+    def __init__(self, number, count, outbound, *args):
+        Bot.__init__(self, *args)
+        self.number = number
+        self.count = count
+        self.outbound = outbound
+        self.outbox = []
+        self.stats_changed = set()  # channels whose stats changed since the last report
+
+    def handle_message(self, fmessage, tags=None):
+        self.stats_changed.add(fmessage.split(' ', 1)[0])
+        Bot.handle_message(self, fmessage, tags)
+
+    def call_function(self, channel, func_name, func, arguments):
+        if func_name == 'stats':
+            target = arguments.split(' ')[0].lower().lstrip('#')
+            if target and worker_for(target, self.count) != self.number:
+                # another worker's channel: the bot answers from its merged stats (see WorkerPool.answer)
+                self.outbound.put(('stats', self.number, channel, arguments))
+                return
+        Bot.call_function(self, channel, func_name, func, arguments)
+
+    def send_raw(self, line, channel=None, priority=CONTROL):
+        self.outbox.append((line, channel, priority))
+        return True  # duplicate replies are merged by the connection's scheduler
+
+    def send_outbox(self):
+        if self.outbox:
+            self.outbound.put(self.outbox)
+            self.outbox = []
+
+    def send_report(self):
+        """sends the worker's metrics, and the stats of its channels that changed, to the bot"""
+        stats = {}
+        if self.chat_stats is not None:
+            stats = {channel: self.chat_stats.channels[channel] for channel in self.stats_changed
+                     if channel in self.chat_stats.channels}
+        self.stats_changed = set()
+        self.outbound.put(('report', self.number, self.metrics, stats))
+
+
+def worker_for(channel, count):
+    """the worker a channel belongs to (a stable hash, so it's the same worker for the whole run)"""
+    return zlib.crc32(channel.encode('utf-8')) % count
+
+
+def copy_settings(bot):
+    """the SETTINGS of a bot, as {name: value}"""
+    settings = {}
+    for name in SETTINGS:
+        helper, _, attribute = name.rpartition('.')
+        owner = getattr(bot, helper) if helper else bot
+        if owner is not None:
+            settings[name] = getattr(owner, attribute)
+    if bot.chat_stats is None:
+        settings['chat_stats'] = None  # stats are off; otherwise each worker keeps them for its own channels
+    return settings
+
+
+def apply_settings(bot, settings):
+    for name, value in settings.items():
+        helper, _, attribute = name.rpartition('.')
+        setattr(getattr(bot, helper) if helper else bot, attribute, value)
+
+
+def run_worker(number, count, args, settings, inbound, outbound):
+    """worker process `number` of `count`: handles batches of lines until it receives None.
+    A batch may also hold (channel, function name, result) tuples: results the bot computed for this worker."""
+    bot = WorkerBot(number, count, outbound, *args)
+    apply_settings(bot, settings)
+    bot.backfill_stats([channel for channel in bot.record or [] if worker_for(channel, count) == number])
+    if bot.chat_stats is not None:
+        bot.stats_changed.update(bot.chat_stats.channels)  # report the backfilled stats
+    bot.log_writer.start()
+    # commands run on the executor's threads, with their timeouts and limits; a finished command wakes the
+    # worker with an empty batch, and its result is sent from here (see CommandExecutor.collect)
+    bot.executor.background = True
+    bot.executor.wake = lambda: inbound.put([])
+    synced = reported = time.monotonic()
+    while True:
+        wait = bot.executor.collect(time.monotonic())
+        try:
+            lines = inbound.get(timeout=bot.config_interval if wait is None else min(wait, bot.config_interval))
+        except queue.Empty:
+            lines = []
+        if lines is None:
+            break
+        for line in lines:
+            try:
+                if isinstance(line, tuple):
+                    bot.handle_result(*line)
+                else:
+                    bot.handle_line(line)
+            except Exception as error:
+                bot.metrics.count('errors')
+                print('worker ' + str(number) + ' failed to handle ' + repr(line) + ': ' + repr(error))
+        bot.executor.collect(time.monotonic())
+        bot.send_outbox()
+        if time.monotonic() - synced >= bot.config_interval:
+            bot.sync_config()
+            bot.send_outbox()
+            synced = time.monotonic()
+        if time.monotonic() - reported >= REPORT_INTERVAL:
+            bot.send_report()
+            reported = time.monotonic()
+    bot.executor.wake = None
+    bot.executor.shutdown()
+    bot.command_store.flush()
+    bot.prohibited_store.flush()
+    bot.log_writer.close()
+    bot.send_report()
+    outbound.put(None)
+
+
+class WorkerPool:
+    def __init__(self, bot, count):
+        """Shards the bot's channels across `count` worker processes
+        :param bot: the Bot that owns the connections
+        :param count: the number of worker processes
+        """
+        self.bot = bot
+        self.count = count
+        self.context = multiprocessing.get_context('spawn')  # safe to start from a process with running threads
+        self.processes = []
+        self.inbound = []       # one queue of line batches per worker
+        self.outbound = None    # lines sent by every worker, as batches of (line, channel, priority), and reports
+        self.metrics = {}       # worker number -> the Metrics it last reported
+        self.pending = {}       # worker number -> lines waiting to be sent to it
+        self.flush_scheduled = False
+        self.closed = False
+        self.loop = None
+        self.thread = None
+
+    def start(self, loop):
+        self.loop = loop
+        self.outbound = self.context.Queue()
+        args = ((self.bot.name, self.bot.oauth), self.bot.channels, self.bot.admins, self.bot.record)
+        settings = copy_settings(self.bot)
+        for number in range(self.count):
+            inbound = self.context.Queue()
+            process = self.context.Process(target=run_worker, name='worker-' + str(number), daemon=True,
+                                           args=(number, self.count, args, settings, inbound, self.outbound))
+            process.start()
+            self.inbound.append(inbound)
+            self.processes.append(process)
+        self.thread = threading.Thread(target=self.receive, name='worker-outbound', daemon=True)
+        self.thread.start()
+
+    def route(self, line, message):
+        """queues a chat message for its channel's worker; returns False for lines the bot should handle itself
+        :param message: the line, parsed (see irc.parse_message)"""
+        if message.command != 'PRIVMSG' or not message.channel:
+            return False
+        self.pending.setdefault(worker_for(message.channel, self.count), []).append(line)
+        if not self.flush_scheduled:
+            # send everything routed while handling the current chunk of data as one batch per worker
+            self.flush_scheduled = True
+            self.loop.call_soon(self.flush)
+        return True
+
+    def flush(self):
+        self.flush_scheduled = False
+        for number, lines in self.pending.items():
+            self.inbound[number].put(lines)
+        self.pending = {}
+
+    def receive(self):
+        """runs on a thread: passes the lines sent by the workers to the bot's connections, and their reports and
+        queries to the bot"""
+        running = self.count
+        while running:
+            lines = self.outbound.get()
+            if lines is None:
+                running -= 1
+            elif isinstance(lines, list):
+                self.loop.call_soon_threadsafe(self.send, lines)
+            elif lines[0] == 'report':
+                _, number, metrics, stats = lines
+                self.metrics[number] = metrics
+                self.loop.call_soon_threadsafe(self.update_stats, stats)
+            elif lines[0] == 'stats':
+                self.loop.call_soon_threadsafe(self.answer, *lines[1:])
+
+    def send(self, lines):
+        for line, channel, priority in lines:
+            self.bot.send_raw(line, channel, priority)
+
+    def update_stats(self, stats):
+        if self.bot.chat_stats is not None:
+            self.bot.chat_stats.channels.update(stats)
+
+    def answer(self, number, channel, arguments):
+        """answers a worker's !stats for a channel another worker handles, from the merged stats"""
+        if not self.closed:
+            self.inbound[number].put([(channel, 'stats', commands.stats(arguments))])
+
+    def stop(self):
+        """tells the workers to stop once they have handled every line already routed to them"""
+        self.flush()
+        self.closed = True
+        for inbound in self.inbound:
+            inbound.put(None)
+
+    def join(self, timeout=5):
+        """waits for the workers to stop. Workers still running after `timeout` seconds (ex: stuck in a command)
+        are terminated. Blocks, so the bot calls it from a thread."""
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            process.join(max(0, deadline - time.monotonic()))
+        for process in self.processes:
+            if process.is_alive():
+                print(process.name + ' did not stop in time; terminating it')
+                process.terminate()
+                process.join()
+                self.outbound.put(None)  # in its place, so receive() stops
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def close(self, timeout=5):
+        """stops the workers (see stop and join)"""
+        self.stop()
+        self.join(timeout)
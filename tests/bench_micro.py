@@ -0,0 +1,82 @@
+"""
+Microbenchmarks for the bot's hot paths, at realistic sizes
+usage: python tests/bench_micro.py [-n ITERATIONS]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import timeit
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+sys.path.insert(0, SRC)
+
+from bot import Bot  # noqa: E402
+from clock import Clock, Cooldowns  # noqa: E402
+from dispatch import CommandIndex  # noqa: E402
+from irc import LineFramer, parse_message  # noqa: E402
+from matcher import PhraseMatcher  # noqa: E402
+from utilities import ChatRecord, LogDate, PhiQueue, RingBuffer  # noqa: E402
+
+LINE = ('@badge-info=subscriber/14;badges=subscriber/12,premium/1;color=#1E90FF;display-name=Someone;emotes=;'
+        'id=b34ccfc7-4977-403a-8a94-33c6bac34fb8;mod=0;room-id=1337;subscriber=1;tmi-sent-ts=1507246572675;'
+        'turbo=0;user-id=1337;user-type= :someone!someone@someone.tmi.twitch.tv PRIVMSG #channel '
+        ':Kappa that play was amazing, did you see the clip on zys.ru? PogChamp PogChamp')
+
+
+def words(count, length=8, seed=1):
+    rand = random.Random(seed)
+    return [''.join(rand.choice(string.ascii_lowercase) for _ in range(length)) for _ in range(count)]
+
+
+def bench(name, statement, number):
+    seconds = timeit.timeit(statement, number=number)
+    print('{:<40} {:>12,.0f} ops/s {:>10.2f} us/op'.format(name, number / seconds, seconds / number * 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('-n', type=int, default=100000, help='iterations for the fast benchmarks')
+    n = parser.parse_args().n
+    os.chdir(SRC)  # the bot reads bot_files/ relative to the working directory
+
+    # chat history at its full 300,000 entries, where every put evicts
+    record = ChatRecord('channel', '[12:00:00]', 'someone', 'hello')
+    ring = RingBuffer([record] * 300000, maxsize=300000)
+    phi = PhiQueue(maxsize=300000)
+    phi.items = [record] * 300000
+    bench('RingBuffer.put (300k, full)', lambda: ring.put(record), n)
+    bench('PhiQueue.put (300k, full)', lambda: phi.put(record), max(n // 1000, 10))
+
+    # parsing
+    framer = LineFramer()
+    chunk = ((LINE + '\r\n') * 10).encode()
+    bench('parse_message (tagged PRIVMSG)', lambda: parse_message(LINE), n)
+    bench('Bot.format_message (raw line)', lambda: Bot.format_message(LINE), n)
+    bench('LineFramer.feed (10 lines)', lambda: framer.feed(chunk), n // 10)
+    bench('LogDate()', LogDate, n)
+    clock = Clock()
+    bench('Clock.timestamp (cached)', lambda: clock.timestamp, n)
+    cooldowns = Cooldowns()
+    bench('Cooldowns.ready + start', lambda: cooldowns.ready('someone', 1.0) and cooldowns.start('someone', 1, 0), n)
+
+    # command dispatch with 500 custom commands
+    names = ['!' + word for word in words(500)]
+    index = CommandIndex(names)
+    message = names[-1] + ' some arguments here'
+    bench('CommandIndex.match (500 commands)', lambda: index.match(message), n)
+    bench('linear startswith scan (500 commands)',
+          lambda: next((name for name in names if message.lower().startswith(name)), None), n // 10)
+
+    # moderation with 5,000 prohibited phrases
+    phrases = words(5000, seed=2)
+    matcher = PhraseMatcher(phrases, casefold=True, normalize='NFKC')
+    chat = parse_message(LINE).trailing
+    matcher.find_all(chat)  # builds the automaton, so the timing covers matching only
+    bench('PhraseMatcher.find_all (5000 phrases)', lambda: matcher.find_all(chat), n // 10)
+    bench('substring scan (5000 phrases)', lambda: [p for p in phrases if p in chat], n // 100)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+End-to-end benchmark: replays chat into a real Bot through a local fake Twitch IRC server
+usage: python tests/bench_replay.py [--logs local_logs/CHANNEL ...] [--rate 2000] [--count 20000]
+Without --logs, synthetic raid traffic is generated. One message in every --probe-every is a !google probe
+whose reply is timed, and the bot runs in its own process so its CPU time and memory can be measured.
+"""
+import argparse
+import asyncio
+import glob
+import multiprocessing
+import os
+import random
+import re
+import resource
+import sys
+import time
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(TESTS, os.pardir, 'src')
+sys.path.insert(0, SRC)
+sys.path.insert(0, TESTS)
+
+from fake_twitch import FakeTwitchServer  # noqa: E402
+
+LOG_LINE = re.compile(r'\[[0-9:]+\] ([^:]+): (.*)')
+PROBE_REPLY = re.compile(r'PRIVMSG #\S+ :http://google\.com/search\?q=probe([0-9]+)')
+BOT_NAME = 'benchbot'
+ADMIN = 'benchadmin'
+
+
+def read_logs(paths):
+    """yields (username, message) pairs from maestrobot .txt chat logs (files or channel folders)"""
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, '*.txt'))) if os.path.isdir(path) else [path]
+        for file_name in files:
+            with open(file_name, encoding='utf-8') as f:
+                for line in f:
+                    match = LOG_LINE.match(line.rstrip('\n'))
+                    if match:
+                        yield match.group(1), match.group(2)
+
+
+def raid_traffic(seed=1):
+    """yields an endless stream of synthetic raid chat: many users, emote spam, copypasta and links"""
+    rand = random.Random(seed)
+    emotes = ['Kappa', 'PogChamp', 'LUL', 'Kreygasm', 'BibleThump', 'SourPls', 'ResidentSleeper', 'monkaS']
+    pastas = ['RAID RAID RAID ' * 3, 'this is the best stream on twitch, no cap ' * 2, 'visit zys.ru for free subs']
+    users = ['raider' + str(i) for i in range(5000)]
+    while True:
+        roll = rand.random()
+        if roll < 0.5:
+            message = ' '.join(rand.choice(emotes) for _ in range(rand.randint(1, 8)))
+        elif roll < 0.8:
+            message = rand.choice(pastas)
+        else:
+            message = 'hey ' + rand.choice(users) + ' what did you think of that ' + rand.choice(emotes)
+        yield rand.choice(users), message
+
+
+def run_bot(port, channels, rate_limits):
+    """the bot process: runs a real Bot against the fake server until an admin whispers !terminate"""
+    os.chdir(SRC)
+    from bot import Bot
+    bot = Bot((BOT_NAME, 'oauth:benchmark'), channels, [ADMIN], [])
+    bot.server = ('127.0.0.1', port)
+    bot.verbose = False
+    bot.metrics_file = None
+    bot.is_moderator = True
+    bot.shard_channels()
+    if not rate_limits:
+        for connection in bot.connections:
+            connection.scheduler.CONNECTION_LIMITS = {False: (10 ** 9, 1), True: (10 ** 9, 1)}
+            connection.scheduler.CHANNEL_LIMITS = {False: None, True: None}
+    bot.join_limiter.bucket.capacity = bot.join_limiter.bucket.tokens = len(channels)
+    bot.run()
+
+
+def percentile(values, p):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def replay(args, traffic):
+    server = FakeTwitchServer()
+    await server.start()
+    channels = ['bench' + str(i) for i in range(args.channels)]
+    probes = {}   # probe number -> time sent
+    replies = {}  # probe number -> time the reply arrived
+    done = asyncio.Event()
+    last_probe = [None]
+
+    def on_line(now, line):
+        match = PROBE_REPLY.match(line)
+        if match:
+            replies[int(match.group(1))] = now
+            if len(replies) == len(probes) and last_probe[0] is not None:
+                done.set()
+
+    server.on_line = on_line
+    process = multiprocessing.get_context('spawn').Process(
+        target=run_bot, args=(server.port, channels, args.rate_limits))
+    process.start()
+    await server.wait_joined(channels)
+
+    batch_interval = 0.01
+    per_batch = max(1, int(args.rate * batch_interval))
+    sent = 0
+    start = time.perf_counter()
+    while sent < args.count:
+        batches = {}
+        for _ in range(min(per_batch, args.count - sent)):
+            channel = channels[sent % len(channels)]
+            if sent % args.probe_every == 0:
+                line = server.privmsg(channel, 'prober', '!google probe' + str(sent))
+                probes[sent] = time.perf_counter()
+            else:
+                username, message = next(traffic)
+                line = server.privmsg(channel, username, message)
+            batches.setdefault(channel, []).append(line)
+            sent += 1
+        for channel, lines in batches.items():
+            server.send(channel, lines)
+        # pace to the target rate
+        delay = start + sent / args.rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            await asyncio.sleep(0)
+    # a final probe in every channel: once they are answered, every message has been handled
+    for channel in channels:
+        probes[sent] = time.perf_counter()
+        server.send(channel, [server.privmsg(channel, 'prober', '!google probe' + str(sent))])
+        sent += 1
+    last_probe[0] = sent
+    if len(replies) == len(probes):
+        done.set()
+    try:
+        await asyncio.wait_for(done.wait(), args.timeout)
+    except asyncio.TimeoutError:
+        print('timed out waiting for replies; %d of %d probes answered' % (len(replies), len(probes)))
+    elapsed = max(replies.values(), default=time.perf_counter()) - start
+
+    server.whisper(ADMIN, BOT_NAME, '!terminate')
+    await asyncio.get_running_loop().run_in_executor(None, process.join, 30)
+    await server.stop()
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    latencies = [(replies[n] - probes[n]) * 1000 for n in replies]
+    print('messages sent          {:,}'.format(sent))
+    print('elapsed                {:.2f} s'.format(elapsed))
+    print('throughput             {:,.0f} messages/s (target {:,})'.format(sent / elapsed, args.rate))
+    print('reply latency p50      {:.2f} ms'.format(percentile(latencies, 50)))
+    print('reply latency p99      {:.2f} ms'.format(percentile(latencies, 99)))
+    print('probes answered        {} / {}'.format(len(replies), len(probes)))
+    print('bot CPU time           {:.2f} s ({:.0f}% of elapsed)'.format(
+        usage.ru_utime + usage.ru_stime, (usage.ru_utime + usage.ru_stime) / elapsed * 100))
+    print('bot peak memory        {:.1f} MB'.format(usage.ru_maxrss / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--logs', nargs='*', help='log files or local_logs/<channel> folders to replay')
+    parser.add_argument('--rate', type=int, default=2000, help='messages per second to send')
+    parser.add_argument('--count', type=int, default=20000, help='number of messages to send')
+    parser.add_argument('--channels', type=int, default=4, help='number of channels to spread messages across')
+    parser.add_argument('--probe-every', type=int, default=50, help='send a timed !google probe every N messages')
+    parser.add_argument('--rate-limits', action='store_true', help="keep Twitch's outbound rate limits")
+    parser.add_argument('--timeout', type=float, default=60, help='seconds to wait for the last replies')
+    args = parser.parse_args()
+    if args.logs:
+        messages = list(read_logs(args.logs))
+        if not messages:
+            parser.error('no chat lines found in ' + ', '.join(args.logs))
+        traffic = (messages[i % len(messages)] for i in range(sys.maxsize))
+    else:
+        traffic = raid_traffic()
+    asyncio.run(replay(args, traffic))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+A local stand-in for Twitch's IRC server, used by the benchmarks
+It accepts any login, answers PINGs, records every line the bot sends and lets the caller inject chat
+messages and whispers into the channels the bot has joined.
+"""
+import asyncio
+import time
+
+
+class FakeTwitchServer:
+    def __init__(self, host='127.0.0.1', port=0):
+        self.host = host
+        self.port = port
+        self.server = None
+        self.writers = []       # every client connection
+        self.joined = {}        # channel -> the writer of the connection that joined it
+        self.sent = []          # (time, line) of every line received from the bot
+        self.on_line = None     # optional callback(time, line) for each line received from the bot
+        self.join_event = asyncio.Event()  # set every time a channel is joined
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for writer in self.writers:
+            writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def wait_joined(self, channels, timeout=30):
+        """waits until every channel in the list has been joined"""
+        deadline = time.monotonic() + timeout
+        while not all(channel in self.joined for channel in channels):
+            self.join_event.clear()
+            await asyncio.wait_for(self.join_event.wait(), max(deadline - time.monotonic(), 0))
+
+    async def handle(self, reader, writer):
+        self.writers.append(writer)
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            now = time.perf_counter()
+            line = line.decode('utf-8', 'replace').rstrip('\r\n')
+            self.sent.append((now, line))
+            if line.startswith('JOIN #'):
+                self.joined[line[6:]] = writer
+                self.join_event.set()
+            elif line.startswith('PING'):
+                writer.write(b'PONG :tmi.twitch.tv\r\n')
+            if self.on_line:
+                self.on_line(now, line)
+        if writer in self.writers:
+            self.writers.remove(writer)
+
+    @staticmethod
+    def privmsg(channel, username, message, user_id=0):
+        """formats a tagged chat message the way Twitch sends it"""
+        return ('@badges=;color=;display-name=' + username + ';user-id=' + str(user_id) + ' :' + username + '!'
+                + username + '@' + username + '.tmi.twitch.tv PRIVMSG #' + channel + ' :' + message + '\r\n')
+
+    def send(self, channel, lines):
+        """writes already formatted lines to the connection that joined the channel"""
+        self.joined[channel].write(''.join(lines).encode('utf-8'))
+
+    def whisper(self, username, bot_name, message):
+        self.writers[0].write((':' + username + '!' + username + '@' + username + '.tmi.twitch.tv WHISPER '
+                               + bot_name + ' :' + message + '\r\n').encode('utf-8'))
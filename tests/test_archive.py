@@ -0,0 +1,75 @@
+import datetime
+import pytest
+import archive
+from logwriter import LogWriter
+
+
+def test_flushed_lines_can_be_queried(tmp_path):
+    writer = LogWriter(directory=str(tmp_path), archive=True)
+    writer.write('chan', '[12:00:00] alice: hello Kappa')
+    writer.write('chan', '[12:00:05] bob: hi')
+    writer.flush()
+    assert list(archive.query([str(tmp_path)], user='alice', workers=1)) == [
+        '#chan ' + datetime.date.today().isoformat() + ' [12:00:00] alice: hello Kappa']
+    writer.write('chan', '[12:01:00] alice: still here')
+    writer.close()
+    assert len(list(archive.query([str(tmp_path)], user='alice', workers=1))) == 2
+
+
+def test_convert_and_query(tmp_path):
+    txt_name = str(tmp_path / 'chan_October_18_2026.txt')
+    with open(txt_name, 'w', encoding='utf-8') as f:
+        for minute in range(60):
+            f.write('[9:%02d:00] user%d: message %d\n' % (minute, minute % 3, minute))
+    arc_name = archive.convert(txt_name, block_lines=10, remove=True)
+    header, blocks = archive.read_index(arc_name)
+    assert (header['channel'], header['date'], len(blocks)) == ('chan', '2026-10-18', 6)
+    assert archive.plan(arc_name, start='2026-10-18T09:25:00', end='2026-10-18T09:35:00')[0][2] == blocks[2]
+    lines = list(archive.query([str(tmp_path)], start='2026-10-18T09:25:00', end='2026-10-18T09:35:00',
+                               user='user1', workers=1))
+    assert [line.split(': ')[1] for line in lines] == ['message 25', 'message 28', 'message 31', 'message 34']
+    assert archive.read_text(arc_name).count('\n') == 60
+
+
+def test_flushes_rewrite_the_tail_until_a_block_is_sealed(tmp_path):
+    arc_name = str(tmp_path / 'chan_October_18_2026.arc')
+    writer = archive.ArchiveWriter(arc_name, 'chan', datetime.date(2026, 10, 18), block_lines=3)
+    for second in range(2):
+        writer.write('[9:00:%02d] alice: line %d' % (second, second))
+        writer.flush()
+    assert archive.read_index(arc_name)[1] == []
+    assert archive.read_text(arc_name) == '[9:00:00] alice: line 0\n[9:00:01] alice: line 1\n'
+    assert len(list(archive.query([str(tmp_path)], user='alice', workers=1))) == 2
+    writer.write('[9:00:02] alice: line 2')
+    assert len(archive.read_index(arc_name)[1]) == 1
+    assert not (tmp_path / 'chan_October_18_2026.arc.tail').exists()
+    writer.write('[9:00:03] bob: line 3')
+    writer.seal_interval = 0
+    writer.flush()
+    assert [block['lines'] for block in archive.read_index(arc_name)[1]] == [3, 1]
+
+
+def test_reopening_an_archive_picks_up_its_tail(tmp_path):
+    arc_name = str(tmp_path / 'chan_October_18_2026.arc')
+    writer = archive.ArchiveWriter(arc_name, 'chan', datetime.date(2026, 10, 18))
+    writer.write('[9:00:00] alice: before a crash')
+    writer.flush()
+    writer = archive.ArchiveWriter(arc_name, 'chan', datetime.date(2026, 10, 18))
+    writer.write('[9:00:05] alice: after')
+    writer.close()
+    assert archive.read_text(arc_name) == '[9:00:00] alice: before a crash\n[9:00:05] alice: after\n'
+    assert not (tmp_path / 'chan_October_18_2026.arc.tail').exists()
+
+
+def test_convert_keeps_existing_archives_unless_forced(tmp_path):
+    txt_name = str(tmp_path / 'chan_October_18_2026.txt')
+    with open(txt_name, 'w', encoding='utf-8') as f:
+        f.write('[9:00:00] alice: first\n')
+    arc_name = archive.convert(txt_name)
+    with open(txt_name, 'w', encoding='utf-8') as f:
+        f.write('[9:00:00] alice: second\n')
+    with pytest.raises(FileExistsError):
+        archive.convert(txt_name)
+    assert archive.read_text(arc_name) == '[9:00:00] alice: first\n'
+    archive.convert(txt_name, force=True)
+    assert archive.read_text(arc_name) == '[9:00:00] alice: second\n'
@@ -0,0 +1,48 @@
+import os
+import pytest
+from bot import Bot
+from clock import clock
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    monkeypatch.chdir(SRC)  # the bot reads bot_files/ relative to the working directory
+    bot = Bot(('mbot', 'oauth:x'), ['chan'], ['admin'], [])
+    bot.verbose = False
+    bot.is_moderator = True
+    bot.flood = None
+    bot.sent = []
+    monkeypatch.setattr(bot, 'send_raw', lambda line, channel=None, priority=None: bot.sent.append(line) or True)
+    return bot
+
+
+def chat(bot, username, message, badges=''):
+    bot.handle_line('@badges=' + badges + ';user-id=1 :' + username + '!' + username + '@' + username +
+                    '.tmi.twitch.tv PRIVMSG #chan :' + message)
+
+
+def test_adding_a_phrase_times_out_earlier_messages_but_not_moderators(bot):
+    chat(bot, 'viewer', 'come to spamsite dot com')
+    chat(bot, 'mod', 'do not go to spamsite', badges='moderator/1')
+    chat(bot, 'chan', 'spamsite is banned now', badges='broadcaster/1')
+    chat(bot, 'other', 'hello')
+    bot.add_prohib('10m', 'spamsite')
+    assert bot.sent == ['PRIVMSG #chan :/timeout viewer 600', 'PRIVMSG #chan :10m viewer for prohibited phrase']
+    bot.prohibited_store.pending = {}  # don't write the test phrase to prohibited.json
+
+
+def test_repeated_command_replies_are_suppressed_but_confirmations_are_not(bot, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(clock, 'monotonic', lambda: now[0])
+    chat(bot, 'viewer', '!test')
+    chat(bot, 'other', '!test')
+    assert bot.sent == ["PRIVMSG #chan :/me I'm working! :) TEST"]
+    now[0] += bot.reply_window
+    chat(bot, 'other', '!test')
+    assert len(bot.sent) == 2
+    bot.sent = []
+    chat(bot, 'admin', '!del nosuchphrase')
+    chat(bot, 'admin', '!del nosuchphrase')
+    assert bot.sent == ['PRIVMSG #chan :phrase deleted'] * 2
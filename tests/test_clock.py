@@ -0,0 +1,38 @@
+import datetime
+import time
+from clock import Clock, Cooldowns
+
+
+def test_timestamp_and_date_follow_the_second(monkeypatch):
+    now = [time.mktime((2026, 10, 18, 23, 59, 59, 0, 0, -1))]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    clock = Clock()
+    assert clock.timestamp == '[23:59:59]'
+    assert clock.date == ('October', '18', '2026', datetime.date(2026, 10, 18))
+    now[0] += 0.5
+    assert clock.timestamp == '[23:59:59]'
+    now[0] += 0.5
+    assert clock.timestamp == '[0:00:00]'
+    assert clock.date == ('October', '19', '2026', datetime.date(2026, 10, 19))
+
+
+def test_cooldowns_expire():
+    cooldowns = Cooldowns()
+    assert cooldowns.ready('alice', 0)
+    cooldowns.start('alice', 5, 0)
+    cooldowns.start('bob', 0, 0)  # no cooldown
+    assert not cooldowns.ready('alice', 4.9)
+    assert cooldowns.ready('alice', 5)
+    assert cooldowns.ready('bob', 0)
+
+
+def test_cooldowns_sweep_expired_entries():
+    cooldowns = Cooldowns(sweep_size=4)
+    for i in range(3):
+        cooldowns.start(i, 1, 0)
+    cooldowns.start('late', 10, 5)  # the table reaches 4 entries, and the 3 that expired are dropped
+    assert list(cooldowns.expires) == ['late']
+    for i in range(20):
+        cooldowns.start(i, 10, 5)
+    assert len(cooldowns.expires) == 21  # none have expired, so nothing is dropped
+    assert not cooldowns.ready(7, 14) and cooldowns.ready(7, 15)
@@ -0,0 +1,69 @@
+import json
+import multiprocessing
+import os
+from configstore import JSONStore
+
+
+def write(file_name, data):
+    with open(file_name, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def read(file_name):
+    with open(file_name, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_changes_are_written_behind(tmp_path):
+    file_name = str(tmp_path / 'commands.json')
+    write(file_name, {'!a': 1})
+    store = JSONStore(file_name, delay=60)
+    store.set('!b', 2)
+    store.delete('!a')
+    assert store.sync() == (set(), set())
+    assert read(file_name) == {'!a': 1}  # the delay hasn't passed
+    store.flush()
+    assert read(file_name) == {'!b': 2}
+    assert os.listdir(str(tmp_path)) == ['commands.json']  # no temporary files left behind
+
+
+def test_changes_made_elsewhere_are_picked_up(tmp_path):
+    file_name = str(tmp_path / 'commands.json')
+    write(file_name, {'!a': 1, '!b': 2})
+    store = JSONStore(file_name, delay=60)
+    store.set('!mine', 3)
+    write(file_name, {'!a': 10, '!c': 4, '!big': 'x' * 10})  # a different size, so the change is noticed
+    changed, removed = store.sync()
+    assert (changed, removed) == ({'!a', '!c', '!big'}, {'!b'})
+    assert store.data == {'!a': 10, '!c': 4, '!big': 'x' * 10, '!mine': 3}
+
+
+def test_invalid_json_is_ignored(tmp_path):
+    file_name = str(tmp_path / 'commands.json')
+    write(file_name, {'!a': 1})
+    store = JSONStore(file_name)
+    with open(file_name, 'w', encoding='utf-8') as f:
+        f.write('{"!a": ')
+    assert store.sync() == (set(), set())
+    assert store.data == {'!a': 1}
+
+
+def save_many(file_name, number):
+    store = JSONStore(file_name, delay=0)
+    for i in range(50):
+        store.set('!worker' + str(number), 'x' * (i * 100))
+        store.save()
+
+
+def test_concurrent_saves_never_leave_broken_json(tmp_path):
+    file_name = str(tmp_path / 'commands.json')
+    write(file_name, {})
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=save_many, args=(file_name, n)) for n in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    assert read(file_name)
+    assert os.listdir(str(tmp_path)) == ['commands.json']
@@ -0,0 +1,39 @@
+import asyncio
+import os
+from bot import Bot
+from tests.fake_twitch import FakeTwitchServer
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+
+
+def test_a_failing_line_does_not_stop_the_bot(monkeypatch):
+    monkeypatch.chdir(SRC)  # the bot reads bot_files/ relative to the working directory
+
+    async def scenario():
+        server = FakeTwitchServer()
+        await server.start()
+        bot = Bot(('mbot', 'oauth:x'), ['one', 'two'], ['admin'], [])
+        bot.server = ('127.0.0.1', server.port)
+        bot.channels_per_connection = 1
+        bot.verbose = False
+        bot.metrics_file = None
+        monkeypatch.setattr(bot, 'handle_whisper', lambda whisper: 1 / 0)
+        task = asyncio.create_task(bot.run_async())
+        await server.wait_joined(['one', 'two'], timeout=10)
+        server.whisper('admin', 'mbot', 'anything')
+        await asyncio.sleep(0.2)
+        server.send('two', [server.privmsg('two', 'viewer', '!test')])
+        for _ in range(50):
+            if any('PRIVMSG #two :' in line for _, line in server.sent):
+                break
+            await asyncio.sleep(0.1)
+        bot.terminate = True
+        for connection in bot.connections:
+            connection.close()
+        await asyncio.wait_for(task, 10)
+        await server.stop()
+        return bot, [line for _, line in server.sent]
+
+    bot, sent = asyncio.run(scenario())
+    assert any(line.startswith('PRIVMSG #two :') for line in sent)
+    assert bot.metrics.counters['errors'] == 1
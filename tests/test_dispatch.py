@@ -0,0 +1,24 @@
+from dispatch import CommandIndex
+
+
+def test_match_returns_command_and_arguments():
+    index = CommandIndex(['!google', '!so long', '!so'])
+    assert index.match('!google neat  thing') == ('!google', 'neat  thing')
+    assert index.match('!so long friend') == ('!so long', 'friend')
+    assert index.match('!so') == ('!so', '')
+    assert index.match('!googled') is None
+    assert index.match('hello !google') is None
+
+
+def test_match_is_case_insensitive_and_returns_the_original_key():
+    index = CommandIndex(['!Hello'])
+    assert index.match('!hello') == ('!Hello', '')
+    assert index.match('!HELLO there') == ('!Hello', 'there')
+    assert '!hello' in index
+
+
+def test_remove():
+    index = CommandIndex(['!Hello', '!help'])
+    index.remove('!hello')
+    assert index.match('!Hello') is None
+    assert index.match('!help') == ('!help', '')
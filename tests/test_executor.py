@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import time
+from executor import CommandExecutor
+
+
+def test_inline_without_an_event_loop():
+    executor = CommandExecutor()
+    results = []
+    assert executor.submit('upper', str.upper, 'hi', results.append)
+    assert results == ['HI']
+
+
+def test_timeouts_and_limits_on_the_event_loop():
+    release = threading.Event()
+
+    async def scenario():
+        executor = CommandExecutor(timeout=0.2, concurrency=1)
+        results = []
+        assert executor.submit('slow', lambda arguments: release.wait(5) and arguments, 'late', results.append)
+        assert not executor.submit('slow', lambda arguments: arguments, 'dropped', results.append)
+        assert executor.submit('fast', lambda arguments: arguments, 'fast', results.append)
+        await asyncio.sleep(0.4)
+        release.set()
+        await asyncio.sleep(0.1)
+        executor.shutdown()
+        return results
+
+    assert asyncio.run(scenario()) == ['fast']
+
+
+def test_background_mode():
+    release = threading.Event()
+    woken = threading.Event()
+    executor = CommandExecutor(timeout=0.2, concurrency=1)
+    executor.background = True
+    executor.wake = woken.set
+    results = []
+    assert executor.submit('slow', lambda arguments: release.wait(5) and arguments, 'late', results.append)
+    assert not executor.submit('slow', lambda arguments: arguments, 'dropped', results.append)
+    assert executor.submit('fast', lambda arguments: arguments, 'fast', results.append)
+    assert results == []  # results are only delivered by collect()
+    assert woken.wait(1)
+    assert 0 < executor.collect(time.monotonic()) <= 0.2
+    assert results == ['fast']
+    time.sleep(0.25)
+    assert executor.collect(time.monotonic()) is None  # the slow call timed out
+    assert not executor.submit('slow', lambda arguments: arguments, 'still running', results.append)
+    release.set()
+    time.sleep(0.1)
+    executor.collect(time.monotonic())  # the slow call has returned, releasing its slot
+    assert executor.submit('slow', lambda arguments: arguments, 'again', results.append)
+    time.sleep(0.1)
+    executor.collect(time.monotonic())
+    assert results == ['fast', 'again']
+    executor.shutdown()
@@ -0,0 +1,52 @@
+from flood import FloodDetector, fingerprint
+
+
+def test_fingerprint_ignores_case_punctuation_order_and_stretching():
+    assert fingerprint('LOOOOL that was great!!') == fingerprint('great was that lol')
+    assert fingerprint('hello there') != fingerprint('hello world')
+
+
+def test_fingerprint_tells_wordless_messages_apart():
+    assert fingerprint('😂') != fingerprint('❤️')
+    assert fingerprint('???') != fingerprint('!!!')
+    assert fingerprint('😂 😂') == fingerprint('😂  😂')
+
+
+def test_flooding():
+    flood = FloodDetector(window=10, user_limit=3)
+    reasons = [flood.check('chan', 'user', 'message ' + str(i), i) for i in range(4)]
+    assert reasons == [None, None, None, 'flooding']
+
+
+def test_repeating_messages():
+    flood = FloodDetector(repeat_limit=3)
+    assert flood.check('chan', 'user', 'buy followers', 0) is None
+    assert flood.check('chan', 'user', 'BUY followers!!', 1) is None
+    assert flood.check('chan', 'user', 'followers buy', 2) == 'repeating messages'
+    assert flood.check('chan', 'user', 'followers buy', 3) is None  # already acted on
+
+
+def test_different_emoji_are_not_repeats():
+    flood = FloodDetector(repeat_limit=3)
+    assert [flood.check('chan', 'user', emoji, i) for i, emoji in enumerate(['😂', '❤️', '🔥'])] == [None] * 3
+
+
+def test_repeats_only_count_inside_the_window():
+    flood = FloodDetector(window=10, repeat_limit=3)
+    assert [flood.check('chan', 'user', 'gg', i * 8) for i in range(5)] == [None] * 5
+
+
+def test_copypasta():
+    flood = FloodDetector(pasta_limit=3, pasta_length=20)
+    pasta = 'this is a very long copypasta that everyone is pasting'
+    assert flood.check('chan', 'a', pasta, 0) is None
+    assert flood.check('chan', 'b', pasta.upper(), 1) is None
+    assert flood.check('chan', 'c', pasta, 2) == 'copypasta spam'
+    assert flood.check('other', 'd', pasta, 3) is None  # counted per channel
+
+
+def test_idle_users_expire():
+    flood = FloodDetector(window=10)
+    flood.check('chan', 'a', 'hello', 0)
+    flood.check('chan', 'b', 'hello', 20)
+    assert list(flood.users) == [('chan', 'b')]
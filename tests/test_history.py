@@ -0,0 +1,41 @@
+from utilities import ChatHistory, ChatRecord, RingBuffer
+
+
+def test_ring_buffer_evicts_the_oldest_item():
+    ring = RingBuffer(maxsize=3)
+    assert [ring.put(i) for i in (1, 2, 3)] == [None, None, None]
+    assert ring.put(4) == 1
+    assert ring.put(5) == 2
+    assert list(ring) == [3, 4, 5]
+    assert (ring[0], ring[-1], len(ring)) == (3, 5, 3)
+    assert ring.is_full()
+
+
+def test_ring_buffer_pop_and_resize():
+    ring = RingBuffer([1, 2, 3, 4], maxsize=4)
+    ring.pop(2)
+    assert list(ring) == [3, 4]
+    ring.put([5, 6, 7])
+    assert list(ring) == [4, 5, 6, 7]
+    ring.set_maxsize(2)
+    assert list(ring) == [6, 7]
+
+
+def test_history_indexes_follow_eviction():
+    history = ChatHistory(maxsize=3)
+    history.put(ChatRecord('a', '[1:00:00]', 'alice', 'one'))
+    history.put(ChatRecord('b', '[1:00:01]', 'bob', 'two'))
+    history.put(ChatRecord('a', '[1:00:02]', 'alice', 'three'))
+    history.put(ChatRecord('a', '[1:00:03]', 'carol', 'four'))  # evicts alice's first message
+    assert [record.message for record in history.user_messages('alice')] == ['three']
+    assert [record.message for record in history.channel_messages('a')] == ['four', 'three']
+    assert history.channel_messages('a', 1)[0].message == 'four'
+    assert history.last_message('bob').channel == 'b'
+    assert history.last_message('alice', 'b') is None
+    history.pop(3)
+    assert history.by_user == {} and history.by_channel == {}
+
+
+def test_chat_record_unpacks_like_a_tuple():
+    channel, timestamp, username, message = ChatRecord('a', '[1:00:00]', 'alice', 'hi')
+    assert (channel, timestamp, username, message) == ('a', '[1:00:00]', 'alice', 'hi')
@@ -0,0 +1,36 @@
+from irc import LineFramer, parse_message
+
+
+def test_framer_joins_lines_split_across_reads():
+    framer = LineFramer(buffer_size=16)
+    assert framer.feed(b'PING :tmi\r\n:a!a@a PRIV') == ['PING :tmi']
+    assert framer.feed(memoryview(b'MSG #c :hi\r\n\r\nPING :x\n')) == [':a!a@a PRIVMSG #c :hi', 'PING :x']
+    assert framer.feed(b'') == []
+
+
+def test_framer_decodes_split_utf8():
+    framer = LineFramer()
+    data = ':a!a@a PRIVMSG #c :café \U0001f602\r\n'.encode('utf-8')
+    assert framer.feed(data[:22]) == []
+    assert framer.feed(data[22:]) == [':a!a@a PRIVMSG #c :café \U0001f602']
+
+
+def test_framer_drops_overlong_partial_lines():
+    framer = LineFramer(max_line=10)
+    assert framer.feed(b'x' * 20) == []
+    assert framer.feed(b'ok\r\n') == ['ok']
+
+
+def test_parse_tagged_privmsg():
+    message = parse_message('@badges=moderator/1,subscriber/12;user-id=1337;display-name=Some\\sone '
+                            ':someone!someone@someone.tmi.twitch.tv PRIVMSG #channel :hello there :)')
+    assert (message.command, message.nick, message.channel, message.trailing) == \
+        ('PRIVMSG', 'someone', 'channel', 'hello there :)')
+    assert message.user_id == '1337'
+    assert message.tags['display-name'] == 'Some one'
+    assert 'moderator' in message.badges
+
+
+def test_parse_ping():
+    message = parse_message('PING :tmi.twitch.tv')
+    assert (message.command, message.trailing, message.channel) == ('PING', 'tmi.twitch.tv', '')
@@ -0,0 +1,37 @@
+import time
+from logwriter import LogWriter
+
+
+def read(tmp_path, day):
+    with open(str(tmp_path / 'chan' / ('chan_' + day + '.txt')), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_lines_are_buffered_until_a_flush(tmp_path):
+    writer = LogWriter(directory=str(tmp_path), flush_size=100, flush_interval=3600)
+    writer.write('chan', '[12:00:00] alice: hello')
+    assert not (tmp_path / 'chan').exists()
+    writer.write('chan', '[12:00:01] bob: ' + 'x' * 100)  # over flush_size
+    assert read(tmp_path, writer.day).count('\n') == 2
+
+
+def test_close_stops_the_thread_and_writes_everything(tmp_path):
+    writer = LogWriter(directory=str(tmp_path), flush_interval=3600)
+    writer.start()
+    for i in range(100):
+        writer.write('chan', '[12:00:00] alice: %d' % i)
+    writer.close()
+    assert writer.thread is None and writer.handles == {}
+    assert read(tmp_path, writer.day).splitlines()[-1] == '[12:00:00] alice: 99'
+
+
+def test_lines_after_midnight_go_to_the_next_days_file(tmp_path, monkeypatch):
+    now = [time.mktime((2026, 10, 18, 23, 59, 59, 0, 0, -1))]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    writer = LogWriter(directory=str(tmp_path), flush_interval=3600)
+    writer.write('chan', '[23:59:59] alice: good night')
+    now[0] += 2
+    writer.write('chan', '[0:00:01] bob: good morning')
+    writer.close()
+    assert read(tmp_path, 'October_18_2026') == '[23:59:59] alice: good night\n'
+    assert read(tmp_path, 'October_19_2026') == '[0:00:01] bob: good morning\n'
@@ -0,0 +1,36 @@
+from matcher import PhraseMatcher
+
+
+def test_finds_every_phrase_in_one_pass():
+    matcher = PhraseMatcher(['he', 'she', 'his', 'hers'])
+    assert matcher.find_all('ushers') == {'he', 'she', 'hers'}
+    assert matcher.find_all('nothing here') == {'he'}
+    assert matcher.find_all('xyz') == set()
+
+
+def test_add_and_remove():
+    matcher = PhraseMatcher(['spam'])
+    matcher.add('scam')
+    assert matcher.find_all('spam and scam') == {'spam', 'scam'}
+    matcher.remove('spam')
+    assert 'spam' not in matcher
+    assert matcher.find_all('spam and scam') == {'scam'}
+    matcher.add('spam')
+    assert matcher.find_all('spam') == {'spam'}
+
+
+def test_case_and_look_alikes():
+    matcher = PhraseMatcher(['zys.ru'], casefold=True, normalize='NFKC')
+    assert matcher.find_all('visit ZYS.RU now') == {'zys.ru'}
+    assert matcher.find_all('visit ｚｙｓ．ｒｕ now') == {'zys.ru'}  # fullwidth characters
+
+
+def test_combining_characters():
+    matcher = PhraseMatcher(['caf\u00e9'], casefold=True, normalize='NFKC')
+    assert matcher.find_all('CAFE\u0301') == {'caf\u00e9'}  # 'E' followed by a combining acute accent
+
+
+def test_exact_matching_without_folding():
+    matcher = PhraseMatcher(['Kappa'])
+    assert matcher.find_all('kappa') == set()
+    assert matcher.find_all('Kappa') == {'Kappa'}
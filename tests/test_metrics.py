@@ -0,0 +1,33 @@
+import json
+from metrics import Histogram, Metrics
+
+
+def test_histogram_percentiles_are_upper_bounds():
+    histogram = Histogram()
+    for elapsed in [1000] * 98 + [50000, 70000]:
+        histogram.record(elapsed)
+    assert histogram.percentile(50) == 1024  # 1000ns falls in the bucket below 2**10
+    assert histogram.percentile(99) == 65536
+    assert histogram.percentile(100) == 70000  # never more than the largest latency
+    assert histogram.report() == {'count': 100, 'mean_us': 2.2, 'p50_us': 1.0, 'p99_us': 65.5, 'max_us': 70.0}
+    assert Histogram().percentile(99) == 0
+
+
+def test_metrics_count_and_record_per_channel(tmp_path):
+    metrics = Metrics()
+    metrics.count('messages')
+    metrics.count('messages', 2)
+    metrics.record('parse', 2000, 'a')
+    metrics.record('parse', 4000, 'b')
+    metrics.record('receive', 1000)
+    assert metrics.counters == {'messages': 3}
+    assert metrics.stages['parse'].count == 2
+    assert sorted(metrics.channels) == [('parse', 'a'), ('parse', 'b')]
+    assert metrics.summary().startswith('parse 2 (')
+    file_name = str(tmp_path / 'logs' / 'metrics.json')
+    metrics.write(file_name)
+    with open(file_name) as f:
+        report = json.load(f)
+    assert report['counters'] == {'messages': 3}
+    assert report['channels']['a']['parse']['count'] == 1
+    assert set(report['stages']) == {'parse', 'receive'}
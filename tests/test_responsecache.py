@@ -0,0 +1,29 @@
+from responsecache import ResponseCache
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(maxsize=2)
+    cache.put('a', 1, 0)
+    cache.put('b', 2, 0)
+    assert cache.get('a', 0) == (True, 1)  # 'b' is now the least recently used
+    cache.put('c', 3, 0)
+    assert len(cache) == 2
+    assert cache.get('b', 0) == (False, None)
+    assert cache.get('a', 0) == (True, 1)
+    assert cache.get('c', 0) == (True, 3)
+
+
+def test_entries_expire_after_their_ttl():
+    cache = ResponseCache(ttl=60)
+    cache.put('a', 1, 0)
+    cache.put('b', 2, 0, ttl=10)
+    assert cache.get('b', 9.9) == (True, 2)
+    assert cache.get('b', 10) == (False, None)
+    assert cache.get('a', 59) == (True, 1)
+    assert cache.get('a', 60) == (False, None)
+    assert len(cache) == 0
+
+
+def test_keys_ignore_spacing():
+    assert ResponseCache.key('chan', 'google', ' python  3 ') == ResponseCache.key('chan', 'google', 'python 3')
+    assert ResponseCache.key('chan', 'google', 'python') != ResponseCache.key('other', 'google', 'python')
@@ -0,0 +1,97 @@
+import time
+from scheduler import CHAT, CONTROL, MODERATION, OutboundScheduler, TokenBucket
+
+
+def test_token_bucket():
+    bucket = TokenBucket(2, 1)
+    assert bucket.ready(0)
+    bucket.take()
+    bucket.take()
+    assert not bucket.ready(0)
+    assert bucket.wait(0) == 0.5
+    assert bucket.ready(0.5)
+
+
+def test_priorities():
+    scheduler = OutboundScheduler(is_moderator=True)
+    scheduler.push('PRIVMSG #a :hello', 'a', CHAT)
+    scheduler.push('PRIVMSG #a :/timeout bob 60', 'a', MODERATION)
+    scheduler.push('PONG :tmi.twitch.tv', None, CONTROL)
+    assert scheduler.pop_ready(0) == ['PONG :tmi.twitch.tv', 'PRIVMSG #a :/timeout bob 60', 'PRIVMSG #a :hello']
+    assert len(scheduler) == 0
+
+
+def test_duplicate_chat_lines_are_merged():
+    scheduler = OutboundScheduler(is_moderator=True)
+    assert scheduler.push('PRIVMSG #a :hi', 'a', CHAT)
+    assert not scheduler.push('PRIVMSG #a :hi', 'a', CHAT)
+    assert scheduler.push('PRIVMSG #b :hi', 'b', CHAT)
+    assert scheduler.pop_ready(0) == ['PRIVMSG #a :hi', 'PRIVMSG #b :hi']
+    assert scheduler.push('PRIVMSG #a :hi', 'a', CHAT)  # sent, so it may be queued again
+
+
+def test_connection_limit():
+    scheduler = OutboundScheduler(is_moderator=False)  # 20 messages per 30 seconds
+    for i in range(25):
+        scheduler.push('PRIVMSG #c%d :%d' % (i, i), 'c%d' % i, CHAT)
+    assert len(scheduler.pop_ready(0)) == 20
+    assert scheduler.pop_ready(0) == []
+    assert scheduler.next_ready(0) == 1.5
+    assert scheduler.pop_ready(1.5) == ['PRIVMSG #c20 :20']
+
+
+def test_channel_limit_keeps_order():
+    scheduler = OutboundScheduler(is_moderator=False)  # one message per second per channel
+    for line in ('one', 'two', 'three'):
+        scheduler.push('PRIVMSG #a :' + line, 'a', CHAT)
+    scheduler.push('PRIVMSG #b :other', 'b', CHAT)
+    assert scheduler.pop_ready(0) == ['PRIVMSG #a :one', 'PRIVMSG #b :other']
+    assert scheduler.pop_ready(1) == ['PRIVMSG #a :two']
+    assert scheduler.pop_ready(2) == ['PRIVMSG #a :three']
+
+
+def test_channels_take_turns():
+    scheduler = OutboundScheduler(is_moderator=True)
+    for line in ('one', 'two', 'three'):
+        scheduler.push('PRIVMSG #a :' + line, 'a', CHAT)
+    scheduler.push('PRIVMSG #b :other', 'b', CHAT)
+    assert scheduler.pop_ready(0) == ['PRIVMSG #a :one', 'PRIVMSG #b :other', 'PRIVMSG #a :two',
+                                      'PRIVMSG #a :three']
+
+
+def test_old_and_excess_chat_lines_are_dropped():
+    scheduler = OutboundScheduler(is_moderator=False, max_chat_age=30, max_chat_depth=3)
+    for i in range(5):
+        scheduler.push('PRIVMSG #a :%d' % i, 'a', CHAT, now=0)
+    scheduler.push('PRIVMSG #a :/timeout bob 60', 'a', MODERATION, now=0)
+    assert (len(scheduler), scheduler.dropped) == (4, 2)
+    assert scheduler.pop_ready(0) == ['PRIVMSG #a :/timeout bob 60']
+    assert scheduler.pop_ready(1) == ['PRIVMSG #a :2']
+    assert scheduler.pop_ready(31) == []  # the rest waited too long
+    assert (len(scheduler), scheduler.dropped) == (0, 4)
+    assert scheduler.next_ready(31) is None
+
+
+def test_a_long_queue_is_not_rescanned():
+    scheduler = OutboundScheduler(is_moderator=False, max_chat_depth=10)
+    for i in range(20000):
+        scheduler.push('PRIVMSG #c%d :hi' % i, 'c%d' % i, CHAT, now=0)
+    scheduler.pop_ready(0)
+    start = time.perf_counter()
+    for i in range(100):
+        scheduler.push('PRIVMSG #c0 :%d' % i, 'c0', CHAT, now=0)
+        scheduler.pop_ready(0)
+        scheduler.next_ready(0)
+    assert time.perf_counter() - start < 0.1
+
+
+def test_shared_limit_spans_schedulers():
+    shared = {}
+    first, second = OutboundScheduler(), OutboundScheduler()
+    first.configure(False, shared)
+    second.configure(False, shared)
+    for i in range(15):
+        first.push('PRIVMSG #a%d :hi' % i, 'a%d' % i, CHAT)
+        second.push('PRIVMSG #b%d :hi' % i, 'b%d' % i, CHAT)
+    assert len(first.pop_ready(0)) + len(second.pop_ready(0)) == 20
+    assert second.next_ready(0) == 1.5
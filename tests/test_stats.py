@@ -0,0 +1,66 @@
+import collections
+import random
+import time
+import archive
+from stats import ChatStats, HeavyHitters, emote_names
+
+NOW = time.mktime((2026, 10, 18, 12, 30, 30, 0, 0, -1))
+
+
+def test_heavy_hitters_stay_within_the_misra_gries_bounds():
+    rng = random.Random(1)
+    keys = ['hot'] * 3000 + ['warm'] * 1000 + ['k%d' % rng.randrange(5000) for _ in range(6000)]
+    rng.shuffle(keys)
+    hitters = HeavyHitters(size=20)
+    for key in keys:
+        hitters.add(key)
+    assert len(hitters.counts) <= 20
+    exact = collections.Counter(keys)
+    for key, count in hitters.counts.items():
+        assert exact[key] - len(keys) / 20 <= count <= exact[key]
+    assert [key for key, count in hitters.top(2)] == ['hot', 'warm']
+
+
+def test_weighted_adds_match_repeated_adds():
+    weighted, repeated = HeavyHitters(size=2), HeavyHitters(size=2)
+    for key, count in (('a', 5), ('b', 3), ('c', 2)):
+        weighted.add(key, count)
+        for _ in range(count):
+            repeated.add(key)
+    assert weighted.counts == repeated.counts == {'a': 3, 'b': 1}
+
+
+def test_rates_and_summary():
+    stats = ChatStats(minutes=10)
+    for second in range(0, 120, 2):  # 30 messages a minute for two minutes
+        stats.add('chan', 'user%d' % (second % 3), 'hi Kappa', now=NOW - 150 + second)
+    assert stats.rates('chan', now=NOW) == (30, 20.0)
+    assert stats.rates('chan', now=NOW + 3600) == (0, 0.0)  # everything has aged out of the series
+    assert stats.summary('other') == 'no stats for #other yet'
+    assert 'top emotes: Kappa (60)' in stats.summary('chan', now=NOW)
+
+
+def test_emotes_come_from_the_tag_when_there_is_one():
+    assert emote_names('Kappa hi Kappa LUL', '25:0-4,9-13/425618:15-17') == {'Kappa', 'LUL'}
+    assert emote_names('Kappa hi 1234 ABC', None) == {'Kappa', 'ABC'}
+
+
+def write_log(folder, day, lines):
+    with open(str(folder / ('chan_October_%d_2026.txt' % day)), 'w', encoding='utf-8') as f:
+        f.write(''.join(line + '\n' for line in lines))
+
+
+def test_backfill_reads_text_and_archived_logs(tmp_path):
+    folder = tmp_path / 'chan'
+    folder.mkdir()
+    write_log(folder, 17, ['[23:59:00] alice: yesterday PogChamp'])
+    write_log(folder, 18, ['[12:29:10] alice: hi', '[12:29:20] bob: Kappa', '[12:29:30] mbot: reply'])
+    write_log(folder, 10, ['[12:00:00] carol: too old'])
+    archive.convert(str(folder / 'chan_October_17_2026.txt'), remove=True)
+    stats = ChatStats(minutes=60 * 24)
+    stats.backfill(str(tmp_path), ['chan'], now=NOW, exclude=('mbot',))
+    assert stats.rates('chan', now=NOW)[0] == 2
+    assert dict(stats.channels['chan'].users.counts) == {'alice': 2, 'bob': 1}
+    assert dict(stats.channels['chan'].emotes.counts) == {'PogChamp': 1, 'Kappa': 1}
+    stats.backfill(str(tmp_path), ['chan'], now=NOW)  # channels are only read once
+    assert stats.channels['chan'].users.counts['alice'] == 2
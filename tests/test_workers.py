@@ -0,0 +1,56 @@
+import asyncio
+import time
+from bot import Bot
+from irc import parse_message
+from metrics import Metrics
+from workers import WorkerPool, apply_settings, copy_settings, worker_for
+from tests.test_bot import SRC
+
+
+def test_route_sends_chat_to_its_channel_worker_only():
+    pool = WorkerPool(None, 4)
+    pool.loop = asyncio.new_event_loop()
+    chat = ':viewer!viewer@viewer.tmi.twitch.tv PRIVMSG #chan :hi'
+    whisper = ':viewer!viewer@viewer.tmi.twitch.tv WHISPER mbot :PRIVMSG #other :hi'
+    assert pool.route(chat, parse_message(chat))
+    assert not pool.route(whisper, parse_message(whisper))
+    assert not pool.route('PING :tmi.twitch.tv', parse_message('PING :tmi.twitch.tv'))
+    assert pool.pending == {worker_for('chan', 4): [chat]}
+    pool.loop.close()
+
+
+def test_settings_include_helpers(monkeypatch):
+    monkeypatch.chdir(SRC)
+    bot = Bot(('mbot', 'oauth:x'), ['chan'], ['admin'], [])
+    bot.executor.timeouts['google'] = 3
+    bot.log_writer.flush_interval = 1
+    bot.response_cache.ttl = 30
+    settings = copy_settings(bot)
+    assert (settings['executor.timeouts'], settings['log_writer.flush_interval'],
+            settings['response_cache.ttl']) == ({'google': 3}, 1, 30)
+    bot.log_writer.flush_interval = 5
+    apply_settings(bot, settings)
+    assert bot.log_writer.flush_interval == 1
+
+
+def test_join_terminates_stuck_workers():
+    pool = WorkerPool(None, 1)
+    pool.outbound = pool.context.Queue()
+    process = pool.context.Process(target=time.sleep, args=(60,), daemon=True)
+    process.start()
+    pool.processes.append(process)
+    start = time.monotonic()
+    pool.join(timeout=0.5)
+    assert not process.is_alive() and time.monotonic() - start < 10
+
+
+def test_merged_metrics_add_up():
+    first, second = Metrics(), Metrics()
+    first.count('messages', 2)
+    second.count('messages', 3)
+    first.record('parse', 1000, 'chan')
+    second.record('parse', 3000, 'chan')
+    first.merge(second)
+    assert first.counters == {'messages': 5}
+    assert (first.stages['parse'].count, first.stages['parse'].max) == (2, 3000)
+    assert first.channels[('parse', 'chan')].total == 4000